@@ -19,12 +19,14 @@ fi
 #             SCRIPT OPTIONS             #
 ########################################## 
 
-OPTSTRING=":hvaAk"
+OPTSTRING=":hvaAkpn"
 
 verbose=0
 astar=0
 astar2=0
 kleesearch=0
+portfolio=0
+nocache=0
 
 while getopts ${OPTSTRING} opt; do
 	case ${opt} in
@@ -36,6 +38,10 @@ while getopts ${OPTSTRING} opt; do
 		echo "  -a : using A-star searcher"
 		echo "  -A : using A-star2 searcher (guiding the exploration towards the Unknown)"
 		echo "  -k : using KLEE default searcher"
+		echo "  -p : portfolio: running the three searchers at the same time until one"
+		echo "       of them reaches the target"
+		echo "Cache (assembly.ll and .dist files, in \$KLEE_REACH_CACHE or ~/.cache/klee-reach):"
+		echo "  -n : generating them again"
 		echo "Debugging:"
 		echo "  -v : verbose mode"
 		exit
@@ -43,20 +49,32 @@ while getopts ${OPTSTRING} opt; do
 	v)
 		verbose=1
 		;;
+	n)
+		nocache=1
+		;;
 	a)
 		astar=1
 		astar2=0
 		kleesearch=0
+		portfolio=0
 		;;
 	A)
 		astar=0
 		astar2=1
 		kleesearch=0
+		portfolio=0
 		;;
 	k)
 		astar=0
 		astar2=0
 		kleesearch=1
+		portfolio=0
+		;;
+	p)
+		astar=0
+		astar2=0
+		kleesearch=0
+		portfolio=1
 		;;
 	?)
 		if [ $OPTARG = "-" ]; then # end of script options
@@ -69,7 +87,10 @@ while getopts ${OPTSTRING} opt; do
 	esac
 done
 
-if [ $kleesearch -ne 1 ]
+if [ $portfolio -eq 1 ]
+then
+	echo "Selected search heuristic: portfolio (A-star, A-star2 and KLEE heuristic)"
+elif [ $kleesearch -ne 1 ]
 	then
 	if [ $astar -eq 0 ]
 	then
@@ -95,11 +116,12 @@ args=""
 bc=0			# bytecode file?
 bc_file=""		# bytecode filename
 
-script_opt='^-[aAkv]' # regex for script options (getopts) 
+script_opt='^-[aAkpnv]+$' # regex for script options (getopts) 
 is_max_instr='^--max-instructions='
 is_output_dir='^--output-dir='
 max_instr=""
 output_dir=""
+klee_opts=""	# KLEE options (before the bytecode file)
 
 # note: we have to the same order for running KLEE
 for arg in $@
@@ -125,6 +147,10 @@ do
 			output_dir=$arg
 		else
 			args="$args $arg"
+			if [ $bc -eq 0 ]
+			then
+				klee_opts="$klee_opts $arg"
+			fi
 		fi
 	fi
 done
@@ -142,85 +168,122 @@ filename=$(echo $bc_file | sed 's#.*/##; s#[.][^.]*$##') # sed -r "s/.+\/(.+)\..
 #     GENERATING LLVM FILE WITH KLEE     #
 ##########################################
 
-### Cleaning potential error files
+# assembly.ll and its .dist file are cached, by hash of the bitcode file, of
+# the KLEE options given before it (they may change the emitted assembly), of
+# the KLEE executable and of the sources of kreachdist (they may change the
+# distances): they are only generated again when one of them changes. A lock
+# per cache entry makes parallel runs on the same bitcode file wait for a 
+# single generation.
+cache_dir=${KLEE_REACH_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/klee-reach}
+kreachdist_hash=$(find "$kreachdist/kreachdist" -name '*.py' -print0 | sort -z | xargs -0 cat | sha256sum)
+key=$( (sha256sum < "$bc_file"; echo "$klee_opts"; echo "$klee"; stat -L -c %Y "$klee"; echo "$kreachdist_hash") | sha256sum | cut -d' ' -f1)
+entry="$cache_dir/$key"
+
+mkdir -p "$cache_dir"
+exec 9> "$entry.lock"
 if [ $verbose -eq 1 ]
 then
-	echo "Cleaning potential error files..."
-	echo "  rm -f __klee_dist_output__"
-	echo "  rm -f __compute_dist_output__"
-	echo "  > Done"
+	echo "Waiting for the cache entry $entry..."
 fi
-rm -f __klee_dist_output__
-rm -f __compute_dist_output__
+flock 9
 
-# note: using same arguments ensures the generation of the "correct" LLVM file
-
-echo "Generating LLVM file..."
-
-### Using klee to generate the LLVM file (we use a temporary output directory)
-if [ $verbose -eq 1 ]
+if [ $nocache -eq 0 ] && [ -f "$entry.ll" ] && [ -f "$entry.dist" ]
 then
-	echo "  $klee --max-instructions=1 --output-dir="__klee_dist_dir__" $args 2&> __klee_dist_output__"
-fi
-$klee --max-instructions=1 --output-dir="__klee_dist_dir__" $args 2&> __klee_dist_output__
+	echo "Using cached LLVM file and distances ($entry)"
+	cp "$entry.ll" $filename.ll
+	cp "$entry.dist" $filename.dist
+else
+	# note: using same arguments ensures the generation of the "correct" LLVM 
+	# file
+	
+	# temporary files of this run (several runs can take place in the same
+	# directory)
+	tmp_dir=$(mktemp -d "$cache_dir/tmp.XXXXXX")
+	trap 'rm -rf "$tmp_dir"' EXIT
+
+	echo "Generating LLVM file..."
+	
+	### Using klee to generate the LLVM file (we use a temporary output 
+	### directory)
+	if [ $verbose -eq 1 ]
+	then
+		echo "  $klee --max-instructions=1 --output-dir="$tmp_dir/klee-out" $args 2&> $tmp_dir/klee_output"
+	fi
+	$klee --max-instructions=1 --output-dir="$tmp_dir/klee-out" $args &> "$tmp_dir/klee_output"
+	
+	### Checking if the last command exits on a success
+	if [ $? -ne 0 ]
+	then
+		echo "ERROR: an error has occured."
+		cat "$tmp_dir/klee_output"
+		rm -rf "$tmp_dir"
+		exit
+	fi
+	mv "$tmp_dir/klee-out/assembly.ll" "$tmp_dir/assembly.ll"
+	echo "  > Done"
+	
+	#########################################
+	#    COMPUTING DISTANCE WITH PYTHON     #
+	#########################################
+	
+	echo "Computing distances..."
+	if [ $verbose -eq 1 ]
+	then
+		echo "  python3 $kreachdist/kreachdist/main.py $tmp_dir/assembly.ll > $tmp_dir/compute_dist_output"
+	fi
+	python3 $kreachdist/kreachdist/main.py "$tmp_dir/assembly.ll" > "$tmp_dir/compute_dist_output"
+	if [ $? -ne 0 ]
+	then
+		echo "ERROR: an error has occured."
+		cat "$tmp_dir/compute_dist_output"
+		rm -rf "$tmp_dir"
+		exit
+	fi
+	echo "  > Done"
 
-### Checking if the last command exits on a success
-if [ $? -ne 0 ]
-then
-	echo "ERROR: an error has occured."
-	cat __klee_dist_output__
-	exit
+	### Storing the results (the .dist file last: an entry is complete once
+	### it is there)
+	if [ $verbose -eq 1 ]
+	then
+		echo "  mv $tmp_dir/assembly.ll $entry.ll"
+		echo "  mv $tmp_dir/assembly.dist $entry.dist"
+	fi
+	mv "$tmp_dir/assembly.ll" "$entry.ll"
+	mv "$tmp_dir/assembly.dist" "$entry.dist"
+	rm -rf "$tmp_dir"
+	cp "$entry.ll" $filename.ll
+	cp "$entry.dist" $filename.dist
 fi
 
+flock -u 9
+exec 9>&-
+
 ### Adding potential --max-instructions option
+kleeargs="$max_instr$args"
 args="$max_instr$output_dir$args"
 
-### Getting LLVM file
-if [ $verbose -eq 1 ]
-then
-	echo "  mv __klee_dist_dir__/assembly.ll $filename.ll"
-fi
-mv __klee_dist_dir__/assembly.ll $filename.ll
-
-### Cleaning temporary files
-if [ $verbose -eq 1 ]
-then
-	echo "  rm -f __klee_dist_output__"
-	echo "  rm -rf __klee_dist_dir__"   
-fi
-rm -f __klee_dist_output__
-rm -rf __klee_dist_dir__
-
-echo "  > Done"
-
 #########################################
-#    COMPUTING DISTANCE WITH PYTHON     #
+#        RUNNING KLEE WITH ASTAR        #
 #########################################
 
-echo "Computing distances..."
-if [ $verbose -eq 1 ]
+if [ $portfolio -eq 1 ]
 then
-	echo "  python3 $kreachdist/kreachdist/main.py $filename.ll > __compute_dist_output__"   
-fi
-python3 $kreachdist/kreachdist/main.py $filename.ll > __compute_dist_output__
-if [ $? -ne 0 ]
-then
-	echo "ERROR: an error has occured."
-	exit
-fi
-
-### Cleaning temporary file
-if [ $verbose -eq 1 ]
-then
-	echo "  rm -f __compute_dist_output__"
+	# each searcher gets its own output directory: DIR-astar, DIR-astar2...
+	portfolio_dir="klee-portfolio"
+	if [ "$output_dir" != "" ]
+	then
+		portfolio_dir=${output_dir#--output-dir=}
+	fi
+	echo ""
+	echo "Starting the portfolio..."
+	if [ $verbose -eq 1 ]
+	then
+		echo "  python3 $kreachdist/kreachdist/portfolio.py --klee $klee --dist $filename.dist --output-dir $portfolio_dir -- $kleeargs"
+	fi
+	echo ""
+	python3 $kreachdist/kreachdist/portfolio.py --klee $klee --dist $filename.dist --output-dir $portfolio_dir -- $kleeargs
+	exit $?
 fi
-rm -f __compute_dist_output__
-
-echo "  > Done"
-
-#########################################
-#        RUNNING KLEE WITH ASTAR        #
-#########################################
 
 selected="KLEE heuristic"
 searcher=""
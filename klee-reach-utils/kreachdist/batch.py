@@ -0,0 +1,328 @@
+from kreachdist.utils.misc import READ_CHUNK_SIZE
+
+import argparse
+import concurrent.futures
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Any, List, Mapping
+
+# Runs klee-reach on many bitcode files and targets: each job of the manifest
+# goes through the steps of klee-reach.sh (generation of assembly.ll by a
+# first KLEE run, distance computation, KLEE run with the searcher) in its own
+# directory, so that the jobs can run concurrently.
+#
+# assembly.ll files are cached by hash of the bitcode file and of the KLEE
+# arguments, .dist files by hash of assembly.ll, of the sources of kreachdist
+# and of the targets: a bitcode file shared by several jobs is only turned 
+# into assembly.ll once, and its distances to the same targets are only 
+# computed once. A lock per cache entry makes concurrent jobs wait for the 
+# one generating it.
+
+SEARCHERS = {"astar": ["--search=astar"], "astar2": ["--search=astar2"],
+			 "klee": []}
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+COLUMNS = ["job", "bitcode", "searcher", "targets", "assembly", "dist",
+		   "status", "time(s)"]
+
+def parse_arguments() -> argparse.Namespace:
+	"""
+	Parses the command line arguments
+	"""
+	parser = argparse.ArgumentParser(
+		description="Runs klee-reach on the jobs of a manifest and writes a "
+					"table of the results")
+	parser.add_argument("manifest",
+						help="JSON Lines file, one job per line: "
+							 "{\"bitcode\": \"prog.bc\", \"targets\": "
+							 "[\"main.c:42\"], \"searcher\": \"astar2\", "
+							 "\"klee_args\": [...], \"program_args\": [...]} "
+							 "(only bitcode is required, relative to the "
+							 "manifest; default targets: klee_reach(), "
+							 "default searcher: astar2)")
+	parser.add_argument("--klee", required=True, metavar="PATH",
+						help="KLEE executable (built with the A-star module)")
+	parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+						metavar="N",
+						help="number of jobs run at the same time (default: "
+							 "number of CPUs)")
+	parser.add_argument("--work-dir", default="klee-reach-batch", metavar="DIR",
+						help="directory of the jobs (default: "
+							 "klee-reach-batch)")
+	parser.add_argument("--cache-dir", metavar="DIR",
+						help="directory of the cached assembly.ll and .dist "
+							 "files (default: WORK_DIR/cache)")
+	parser.add_argument("--timeout", type=int, metavar="S",
+						help="time limit of each KLEE run with the searcher")
+	parser.add_argument("--output", metavar="TABLE",
+						help="also write the results in TABLE (tab-separated "
+							 "values)")
+	args = parser.parse_args()
+	if args.jobs < 1:
+		parser.error("at least one job has to run at a time")
+	if args.cache_dir == None:
+		args.cache_dir = os.path.join(args.work_dir, "cache")
+	return args
+
+def read_manifest(file_name: str) -> List[Mapping[str, Any]]:
+	"""
+	Reads the jobs of a manifest (empty lines and lines starting with '#' are
+	ignored). Raises ValueError on an invalid job.
+	"""
+	jobs: List[Mapping[str, Any]] = []
+	with open(file_name) as f:
+		for number, line in enumerate(f, 1):
+			if line.strip() == "" or line.startswith("#"):
+				continue
+			try:
+				job = json.loads(line)
+			except json.JSONDecodeError as e:
+				raise ValueError(f"line {number}: {e}")
+			if not isinstance(job, dict) or "bitcode" not in job:
+				raise ValueError(f"line {number}: a job needs a bitcode file")
+			job.setdefault("targets", [])
+			job.setdefault("searcher", "astar2")
+			job.setdefault("klee_args", [])
+			job.setdefault("program_args", [])
+			if job["searcher"] not in SEARCHERS:
+				raise ValueError(f"line {number}: unknown searcher "
+								 f"'{job['searcher']}' (expected one of "
+								 f"{', '.join(SEARCHERS)})")
+			job["targets"] = [str(target) for target in job["targets"]]
+			# relative to the manifest
+			job["bitcode"] = os.path.join(os.path.dirname(file_name),
+										  job["bitcode"])
+			jobs.append(job)
+	return jobs
+
+def hash_file(file_name: str, *extra: str) -> str:
+	"""
+	Hashes the content of a file and extra strings (e.g. arguments)
+	"""
+	h = hashlib.sha256()
+	with open(file_name, "rb") as f:
+		while chunk := f.read(READ_CHUNK_SIZE):
+			h.update(chunk)
+	for s in extra:
+		h.update(b"\0" + s.encode())
+	return h.hexdigest()
+
+def sources_digest() -> str:
+	"""
+	Hashes the sources of kreachdist, so that the distances computed by 
+	another version are not reused
+	"""
+	h = hashlib.sha256()
+	package: str = os.path.dirname(os.path.abspath(__file__))
+	for file_name in sorted(glob.glob(os.path.join(package, "**", "*.py"),
+									  recursive=True)):
+		h.update(os.path.relpath(file_name, package).encode() + b"\0")
+		with open(file_name, "rb") as f:
+			h.update(f.read())
+	return h.hexdigest()
+
+def cached(cache_file_name: str, generate) -> bool:
+	"""
+	Makes sure that a cache entry exists, calling generate(temporary file
+	name) to write it if needed. Concurrent calls for the same entry wait for
+	the one generating it.
+	Returns True if the entry already existed.
+	"""
+	if os.path.exists(cache_file_name):
+		return True
+	with open(cache_file_name + ".lock", "w") as lock:
+		fcntl.flock(lock, fcntl.LOCK_EX)
+		if os.path.exists(cache_file_name): # generated while waiting
+			return True
+		temporary: str = f"{cache_file_name}.{os.getpid()}.tmp"
+		try:
+			generate(temporary)
+		except BaseException:
+			if os.path.exists(temporary):
+				os.remove(temporary)
+			raise
+		os.replace(temporary, cache_file_name) # never seen half-written
+	return False
+
+def run(command: List[str], log_file_name: str, timeout: int = None) -> int:
+	"""
+	Runs a command with its output in a log file
+	Returns its exit code (None if it has been killed by the timeout)
+	"""
+	with open(log_file_name, "w") as log:
+		try:
+			return subprocess.run(command, stdout=log, stderr=subprocess.STDOUT,
+								  timeout=timeout).returncode
+		except subprocess.TimeoutExpired:
+			return None
+
+def has_reached(output_dir: str) -> bool:
+	"""
+	Checks if a KLEE run has reached the target (a test case of the Reach
+	error type has been written in its output directory)
+	"""
+	return glob.glob(os.path.join(output_dir, "*.reached.err")) != []
+
+def run_job(
+		number: int,
+		job: Mapping[str, Any],
+		klee: str,
+		work_dir: str,
+		cache_dir: str,
+		sources: str,
+		timeout: int | None
+	) -> Mapping[str, Any]:
+	"""
+	Runs the steps of klee-reach.sh for a job in its own directory
+	Returns the row of the job in the results table
+	"""
+	name: str = os.path.splitext(os.path.basename(job["bitcode"]))[0]
+	job_dir: str = os.path.join(work_dir, f"{number:04d}-{name}")
+	shutil.rmtree(job_dir, ignore_errors=True)
+	os.makedirs(job_dir)
+	row: Mapping[str, Any] = {"job": number, "bitcode": job["bitcode"],
+							  "searcher": job["searcher"],
+							  "targets": ",".join(job["targets"]) or "klee_reach",
+							  "assembly": "-", "dist": "-", "status": "error",
+							  "time(s)": "-"}
+	bitcode: str = os.path.abspath(job["bitcode"])
+	# the output directory of every KLEE run is set here
+	klee_args: List[str] = [arg for arg in job["klee_args"]
+							if not arg.startswith("--output-dir=")]
+	# the assembly.ll run stops after its first instruction
+	assembly_args: List[str] = [arg for arg in klee_args
+								if not arg.startswith("--max-instructions=")]
+
+	# assembly.ll: a first KLEE run (same arguments as the real one)
+	def generate_assembly(file_name: str) -> None:
+		output_dir: str = os.path.join(job_dir, "klee-assembly")
+		code = run([klee, "--max-instructions=1", f"--output-dir={output_dir}"]
+				   + assembly_args + [bitcode] + job["program_args"],
+				   os.path.join(job_dir, "assembly.log"))
+		if code != 0:
+			raise RuntimeError("cannot generate assembly.ll (see assembly.log)")
+		shutil.move(os.path.join(output_dir, "assembly.ll"), file_name)
+		shutil.rmtree(output_dir, ignore_errors=True)
+
+	# .dist: distances to the targets
+	def generate_dist(file_name: str) -> None:
+		dist_file_name: str = os.path.join(job_dir, "assembly.dist")
+		command: List[str] = [sys.executable, MAIN, assembly, "--output",
+							  dist_file_name]
+		for target in job["targets"]:
+			command += ["--target", target]
+		code = run(command, os.path.join(job_dir, "kreachdist.log"))
+		if code != 0 or not os.path.exists(dist_file_name):
+			raise RuntimeError("cannot compute the distances (see "
+							   "kreachdist.log)")
+		os.replace(dist_file_name, file_name)
+
+	try:
+		assembly_key: str = hash_file(bitcode, *assembly_args)
+		cached_assembly: str = os.path.join(cache_dir, assembly_key + ".ll")
+		row["assembly"] = ("cached" if cached(cached_assembly, generate_assembly)
+						   else "generated")
+		assembly: str = os.path.join(job_dir, "assembly.ll")
+		shutil.copyfile(cached_assembly, assembly)
+
+		dist_key: str = hash_file(assembly, sources, *job["targets"])
+		cached_dist: str = os.path.join(cache_dir, dist_key + ".dist")
+		row["dist"] = ("cached" if cached(cached_dist, generate_dist)
+					   else "computed")
+		dist: str = os.path.join(job_dir, "assembly.dist")
+		shutil.copyfile(cached_dist, dist)
+
+		# KLEE with the searcher, until the target is reached
+		output_dir: str = os.path.join(job_dir, "klee-out")
+		start: float = time.perf_counter()
+		code = run([klee, "--exit-on-error-type=Reach",
+					f"--input-distance-file={dist}"]
+				   + SEARCHERS[job["searcher"]]
+				   + [f"--output-dir={output_dir}"] + klee_args
+				   + [bitcode] + job["program_args"],
+				   os.path.join(job_dir, "klee.log"), timeout)
+		row["time(s)"] = f"{time.perf_counter() - start:.2f}"
+	except (OSError, RuntimeError) as e:
+		row["status"] = f"error: {e}"
+		return row
+
+	if has_reached(output_dir):
+		row["status"] = "reached"
+	elif code == None:
+		row["status"] = "timeout"
+	elif code == 0:
+		row["status"] = "not reached"
+	else:
+		row["status"] = f"error: KLEE exited with {code} (see klee.log)"
+	return row
+
+def write_table(rows: List[Mapping[str, Any]], file_name: str) -> None:
+	"""
+	Writes the results in a file (tab-separated values)
+	"""
+	with open(file_name, "w") as f:
+		f.write("\t".join(COLUMNS) + "\n")
+		for row in rows:
+			f.write("\t".join(str(row[c]) for c in COLUMNS) + "\n")
+	return None
+
+def display_table(rows: List[Mapping[str, Any]]) -> None:
+	"""
+	Displays the results
+	"""
+	widths: List[int] = [max([len(c)] + [len(str(row[c])) for row in rows])
+						 for c in COLUMNS]
+	print("  ".join(f"{c:<{w}}" for c, w in zip(COLUMNS, widths)))
+	for row in rows:
+		print("  ".join(f"{str(row[c]):<{w}}" for c, w in zip(COLUMNS, widths)))
+	return None
+
+def batch() -> None:
+	"""
+	Runs the jobs of the manifest (at most --jobs at the same time) and
+	outputs the results, in the order of the manifest
+	"""
+	args = parse_arguments()
+	try:
+		jobs = read_manifest(args.manifest)
+	except (OSError, ValueError) as e:
+		print(f"ERROR: cannot read the manifest: {e}")
+		return None
+
+	work_dir: str = os.path.abspath(args.work_dir)
+	cache_dir: str = os.path.abspath(args.cache_dir)
+	os.makedirs(work_dir, exist_ok=True)
+	os.makedirs(cache_dir, exist_ok=True)
+
+	sources: str = sources_digest()
+	rows: List[Mapping[str, Any]] = []
+	with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+		futures = [pool.submit(run_job, number, job, args.klee, work_dir,
+							   cache_dir, sources, args.timeout)
+				   for number, job in enumerate(jobs, 1)]
+		for future in futures:
+			row = future.result()
+			print(f"[{row['job']}/{len(jobs)}] {row['bitcode']} "
+				  f"({row['searcher']}): {row['status']}")
+			rows.append(row)
+
+	print("")
+	display_table(rows)
+	if args.output != None:
+		write_table(rows, args.output)
+		print(f"Results wrote in {args.output}")
+	return None
+
+def main():
+	batch()
+
+if __name__ == "__main__": # the worker processes import this module
+	main()
@@ -0,0 +1,111 @@
+from kreachdist.compute_distance import build_dist_file
+from kreachdist.landmarks import compute_landmarks, approximate_dist_file
+from kreachdist.summary import summarize_functions
+from kreachdist.parse import parse
+from kreachdist.utils.CallPaths import build_supergraph
+from kreachdist.utils.misc import get_file_stamp
+
+import argparse
+import time
+from typing import List, Mapping
+
+def parse_arguments() -> argparse.Namespace:
+	"""
+	Parses the command line arguments
+	"""
+	parser = argparse.ArgumentParser(
+		description="Compares the approximate distances (landmarks) with the "
+					"exact ones on a LLVM file: computation times and errors")
+	parser.add_argument("file", help="LLVM file (.ll)")
+	parser.add_argument("--landmarks", type=int, nargs="+", default=[4, 8, 16],
+						metavar="K", help="numbers of landmarks to try")
+	parser.add_argument("--radius", type=int, nargs="+", default=[0, 100, 1000],
+						metavar="R", help="exact radii to try")
+	return parser.parse_args()
+
+def compare(
+		exact: Mapping[int, int],
+		approximate: Mapping[int, int]
+	) -> Mapping[str, float]:
+	"""
+	Computes the errors of approximate distances with respect to exact ones
+	"""
+	errors: List[int] = []
+	relative_errors: List[float] = []
+	for line, distance in exact.items():
+		estimate = approximate.get(line)
+		if estimate == None:
+			continue
+		errors.append(abs(estimate - distance))
+		relative_errors.append(abs(estimate - distance) / max(distance, 1))
+	n = max(len(errors), 1)
+	return {
+		"missing": len([line for line in exact if line not in approximate]),
+		"extra": len([line for line in approximate if line not in exact]),
+		"exact(%)": 100 * len([e for e in errors if e == 0]) / n,
+		"mean_err": sum(errors) / n,
+		"mean_rel_err(%)": 100 * sum(relative_errors) / n,
+		"max_err": max(errors, default=0),
+	}
+
+def benchmark():
+	"""
+	Runs the exact computation once, then the approximate computation for each
+	number of landmarks and each radius, and prints a report
+	"""
+	args = parse_arguments()
+
+	start = time.perf_counter()
+	program = parse(args.file)
+	summaries = summarize_functions(program, False)
+	supergraph = build_supergraph(program.get_cfgs())
+	analysis_time = time.perf_counter() - start
+	cfgs = program.get_cfgs()
+
+	start = time.perf_counter()
+	exact_dist = build_dist_file(cfgs, summaries, False, supergraph)
+	exact_time = time.perf_counter() - start
+	# the target can get two distances: the first one (the smallest) is kept
+	exact: Mapping[int, int] = {}
+	for line, distance in exact_dist.get_elements():
+		exact.setdefault(line, distance)
+
+	print(f"File: {args.file}")
+	print(f"Parsing + summaries + supergraph: {analysis_time:.3f}s")
+	print(f"Exact distances: {exact_time:.3f}s ({len(exact)} lines)")
+	print("")
+
+	columns = ["K", "radius", "landmarks(s)", "query(s)", "speedup",
+			   "missing", "extra", "exact(%)", "mean_err", "mean_rel_err(%)",
+			   "max_err"]
+	print(" ".join(f"{c:>15}" for c in columns))
+
+	stamp = get_file_stamp(args.file)
+	for count in args.landmarks:
+		start = time.perf_counter()
+		landmarks = compute_landmarks(cfgs, summaries, supergraph, count, stamp)
+		landmarks_time = time.perf_counter() - start
+
+		for radius in args.radius:
+			start = time.perf_counter()
+			approximate_dist = approximate_dist_file(cfgs, summaries, supergraph,
+													 landmarks, radius, False)
+			query_time = time.perf_counter() - start
+			approximate: Mapping[int, int] = {}
+			for line, distance in approximate_dist.get_elements():
+				approximate.setdefault(line, distance)
+
+			row = {"K": count, "radius": radius,
+				   "landmarks(s)": f"{landmarks_time:.3f}",
+				   "query(s)": f"{query_time:.3f}",
+				   "speedup": f"{exact_time / max(query_time, 1e-9):.2f}"}
+			row.update({k: (f"{v:.2f}" if isinstance(v, float) else v)
+						for k, v in compare(exact, approximate).items()})
+			print(" ".join(f"{row[c]:>15}" for c in columns))
+
+	return None
+
+def main():
+	benchmark()
+
+main()
@@ -1,52 +1,191 @@
 from kreachdist.datastructs.BasicBlock import BasicBlock
 from kreachdist.datastructs.DistanceContainer import DistanceContainer
+from kreachdist.datastructs.NextHopContainer import NextHopContainer
 from kreachdist.datastructs.CFG import CFG
-from kreachdist.utils.CallPaths import compute_g_call, compute_g_ret, transpose_g_call, transpose_g_ret
+from kreachdist.datastructs.Supergraph import Supergraph
+from kreachdist.utils.CallPaths import build_supergraph
 from kreachdist.utils.regex import is_klee_reach, extract_called_function, is_label_definition, is_define, is_call
 from kreachdist.utils.misc import get_cfg_by_name, get_last_instr
 
 
 import heapq
-from typing import Mapping, List, Tuple
+import math
+from typing import Iterator, Mapping, List, Set, Tuple
 
 def build_dist_file(
 		cfgs: List[CFG],
 		summaries: Mapping[str, int],
-		debug: bool
+		debug: bool,
+		supergraph: Supergraph = None,
+		targets: List[Tuple] = None,
+		max_distance: int = None,
+		max_lines: int = None,
+		next_hops: NextHopContainer = None
 	) -> DistanceContainer:
 	"""
 	Compute all distances between LLVM instructions to the LLVM target instruction
+
+	`targets` is a list of (cfg_name, basic_block_id), or of (cfg_name, 
+	basic_block_id, line) when the target is a single instruction of the basic
+	block (see `find_targets_by_lines`): by default, the target is the first 
+	call to klee_reach. When there are several targets, the distance of an 
+	instruction is its distance to the nearest one. The instructions following
+	the last target of a basic block get no distance from this basic block.
+	The supergraph is computed from the CFGs if not given.
+
+	Only the instructions at distance max_distance at most are kept, and only
+	the nearest ones when there would be more than max_lines distances: the 
+	distances beyond the cutoff (the greatest distance up to which all the 
+	instructions are kept) are considered infinite (missing), and the 
+	container records the cutoff.
+
+	When `next_hops` is given, it is filled with the shortest-path tree: the 
+	next hop of every basic block which gets a distance.
 	"""
 
-	# Computing G_call & G_ret from CFGs
-	g_call: Mapping[Tuple[str, int], Tuple[str, int]] = compute_g_call(cfgs)
-	g_ret: Mapping[Tuple[str, int], List[Tuple[str, int]]] = compute_g_ret(cfgs, g_call)
-	
-	# Transpose G_call & G_ret (we only work on tranpose graph here)
-	g_call_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = transpose_g_call(g_call)
-	g_ret_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = transpose_g_ret(g_ret)
+	if supergraph == None:
+		supergraph = build_supergraph(cfgs)
 
 	dist: DistanceContainer = DistanceContainer()
 
-	target_func: str
-	target_bb_id: int
-	target_func, target_bb_id = find_target(cfgs)
+	if targets == None:
+		targets = default_targets(cfgs)
 
-	if target_func == "": # no target found (i.e. no 'klee-reach' instruction)
+	if targets == []: # no target found (i.e. no 'klee-reach' instruction)
 		print("WARNING: no target found")
 		return dist
 
+	lines: Mapping[Tuple[str, int], Set[int]] = target_lines(cfgs, targets)
+
+	# the instructions of a basic block at distance bb_dist are at least at 
+	# bb_dist - longest: once this bound is beyond the limits, no instruction 
+	# of the remaining basic blocks can be kept
+	longest: int = 0
+	if max_distance != None or max_lines != None:
+		longest = max(executed_lines(bb) for cfg in cfgs
+					  for bb in cfg.get_basic_blocks())
+	# max-heap of the max_lines + 1 smallest distances found so far
+	smallest: List[int] = []
+
+	# all the distances are computed before the limits are applied: (basic 
+	# block, next hop, first and last index of its distances in `dist`)
+	reached: List[Tuple[BasicBlock, Tuple[str, str, int], int, int]] = []
+	complete: bool = True
+	for bb_dist, cfg, current_bb, hop in explore_backward(cfgs, summaries,
+														  supergraph, targets,
+														  debug):
+		if ((max_distance != None and bb_dist - longest > max_distance) or
+			(max_lines != None and len(smallest) > max_lines and
+			 -smallest[0] <= bb_dist - longest)):
+			complete = False
+			break
+		start: int = len(dist.get_elements())
+		add_bb_distances(dist, current_bb, bb_dist,
+						 lines.get((cfg.get_name(), current_bb.get_id())))
+		reached.append((current_bb, hop, start, len(dist.get_elements())))
+		if max_lines != None:
+			for _, distance in dist.get_elements()[start:]:
+				if len(smallest) <= max_lines:
+					heapq.heappush(smallest, -distance)
+				elif distance < -smallest[0]:
+					heapq.heapreplace(smallest, -distance)
+
+	# the greatest distance up to which all the instructions are kept
+	cutoff: int | None = None
+	if max_distance != None and (not complete or any(
+			distance > max_distance for _, distance in dist.get_elements())):
+		cutoff = max_distance
+	if max_lines != None and len(smallest) > max_lines:
+		cutoff = (-smallest[0] - 1 if cutoff == None
+				  else min(cutoff, -smallest[0] - 1))
+
+	elements: List[Tuple[int, int]] = dist.get_elements()
+	if cutoff != None:
+		dist = DistanceContainer()
+		dist.set_cutoff(cutoff)
+	for current_bb, hop, start, end in reached:
+		kept: List[int] = []
+		for line, distance in elements[start:end]:
+			if cutoff == None or distance <= cutoff:
+				kept.append(line)
+				if cutoff != None:
+					dist.add_element(line, distance)
+		if next_hops != None and kept != []:
+			add_bb_next_hop(next_hops, cfgs, current_bb, hop, kept)
+
+	if next_hops != None:
+		next_hops.set_cutoff(dist.get_cutoff())
+
+	return dist
+
+def limit_distances(
+		dist: DistanceContainer,
+		max_distance: int = None,
+		max_lines: int = None
+	) -> DistanceContainer:
+	"""
+	Applies max_distance and max_lines (see `build_dist_file`) to distances 
+	already computed: returns the distances up to the cutoff, with the cutoff
+	recorded (the same container if nothing is cut)
+	"""
+	distances: List[int] = sorted(distance for _, distance in dist.get_elements())
+	cutoff: int | None = None
+	if max_distance != None and distances != [] and distances[-1] > max_distance:
+		cutoff = max_distance
+	if max_lines != None and len(distances) > max_lines:
+		cutoff = (distances[max_lines] - 1 if cutoff == None
+				  else min(cutoff, distances[max_lines] - 1))
+	if cutoff == None:
+		return dist
+
+	limited: DistanceContainer = DistanceContainer()
+	limited.set_cutoff(cutoff)
+	for line, distance in dist.get_elements():
+		if distance <= cutoff:
+			limited.add_element(line, distance)
+	return limited
+
+def explore_backward(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		targets: List[Tuple],
+		debug: bool
+	) -> Iterator[Tuple[int, CFG, BasicBlock, Tuple[str, str, int]]]:
+	"""
+	Explores the supergraph backward from the targets (Dijkstra's algorithm) 
+	and yields each reached basic block with its distance, in increasing order
+	of distance. The distance of a basic block includes its weight (its size,
+	unless run.istats costs have been applied), up to the first target 
+	instruction for a target basic block. Target basic blocks are only reached
+	as targets.
+
+	The next hop of the basic block on its shortest path is yielded too, as 
+	(edge, cfg_name, basic_block_id): the edge is "succ" (successor in the 
+	same CFG), "call" (entry of the called function), "ret" (return site in 
+	the caller) or "target" (the basic block is a target).
+	"""
+
+	# Transpose G_call & G_ret (we only work on tranpose graph here)
+	g_call_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = supergraph.get_g_call_t()
+	g_ret_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = supergraph.get_g_ret_t()
+
+	visited: List[List[bool]] = [[False for _ in cfg.get_basic_blocks()] for cfg in cfgs]
+
 	heap: List[int, Tuple[str, int, bool]]= []
 	heapq.heapify(heap) # min-heap
-	current_cfg: CFG = get_cfg_by_name(cfgs, target_func)
-
-	# (distance, (cfg_name, basic_block_id, has_took_ret))
-	heapq.heappush(heap,
-				   (current_cfg.get_basic_block(target_bb_id).size(),
-					(target_func, target_bb_id, False)
-				   )
-				  )
-	visited: List[List[bool]] = [[False for _ in cfg.get_basic_blocks()] for cfg in cfgs]
+	for (target_func, target_bb_id), lines in target_lines(cfgs, targets).items():
+		current_cfg: CFG = get_cfg_by_name(cfgs, target_func)
+
+		# (distance, (cfg_name, basic_block_id, has_took_ret), next hop)
+		heapq.heappush(heap,
+					   (target_distance(current_cfg.get_basic_block(target_bb_id),
+										lines),
+						(target_func, target_bb_id, False),
+						("target", target_func, target_bb_id)
+					   )
+					  )
+		visited[current_cfg.get_id()][target_bb_id] = True
 
 	if debug:
 		print("Starting distance computation...")
@@ -62,14 +201,7 @@ def build_dist_file(
 		current_cfg: CFG = get_cfg_by_name(cfgs, s[1][0])
 		current_bb: BasicBlock = current_cfg.get_basic_block(s[1][1])
 
-		dist_value: int = s[0]
-		# assigning a distance for each instr in the basic block according to 
-		# dist_value
-		for line in current_bb.get_llvm_instructions():
-			# we only attribuate a distance for instructions executed by KLEE
-			if not is_label_definition(line.get_instr()) and not is_define(line.get_instr()):
-				dist_value -= 1
-				dist.add_element(line.get_line(), dist_value)
+		yield s[0], current_cfg, current_bb, s[2]
 
 		current_cfg_id: int = current_cfg.get_id()
 		current_cfg_name: str = current_cfg.get_name()
@@ -83,11 +215,12 @@ def build_dist_file(
 				# summary in value
 				summary = add_summary(summaries,
 						  			  current_cfg.get_basic_block(next_bb_id))
-				next_bb_size: int = current_cfg.get_basic_block(next_bb_id).size()
-				value = current_dist + next_bb_size + summary
+				next_bb_weight: int = current_cfg.get_basic_block(next_bb_id).weight()
+				value = current_dist + next_bb_weight + summary
 
 				heapq.heappush(heap,
-				   			   (value, (current_cfg_name, next_bb_id, has_took_ret))
+				   			   (value, (current_cfg_name, next_bb_id, has_took_ret),
+								("succ", current_cfg_name, current_bb.get_id()))
 							  )
 
 				visited[current_cfg_id][next_bb_id] = True
@@ -121,7 +254,167 @@ def build_dist_file(
 										has_took_ret
 									  )
 
-	return dist
+def reachable_blocks(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		targets: List[Tuple]
+	) -> Set[Tuple[str, int]]:
+	"""
+	Returns the basic blocks which reach the targets, following the same 
+	edges as `explore_backward` (and the same rule for call edges after a 
+	return edge) without computing any distance. The basic blocks which only
+	reach the targets through a call to an infinite function are missing.
+	"""
+	g_call_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = supergraph.get_g_call_t()
+	g_ret_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = supergraph.get_g_ret_t()
+
+	# (cfg_name, basic_block_id, has_took_ret)
+	reached: Set[Tuple[str, int, bool]] = {(cfg_name, bb_id, False) for cfg_name, bb_id
+										   in target_lines(cfgs, targets)}
+	worklist: List[Tuple[str, int, bool]] = list(reached)
+	while worklist:
+		cfg_name, bb_id, has_took_ret = worklist.pop()
+		current_cfg: CFG = get_cfg_by_name(cfgs, cfg_name)
+
+		next_states: List[Tuple[str, int, bool]] = [
+			(cfg_name, pred_id, has_took_ret)
+			for pred_id in current_cfg.get_basic_block(bb_id).get_pred()
+			if add_summary(summaries, current_cfg.get_basic_block(pred_id)) != math.inf
+		]
+		next_states += [(name, next_bb, True)
+						for name, next_bb in g_ret_t.get((cfg_name, bb_id), ())]
+		if not has_took_ret:
+			next_states += [(name, next_bb, False)
+							for name, next_bb in g_call_t.get((cfg_name, bb_id), ())]
+
+		for state in next_states:
+			if state not in reached:
+				reached.add(state)
+				worklist.append(state)
+
+	return {(cfg_name, bb_id) for cfg_name, bb_id, _ in reached}
+
+def executed_lines(basic_block: BasicBlock) -> int:
+	"""
+	Returns the number of instructions of a basic block that get a distance
+	"""
+	return len([line for line in basic_block.get_llvm_instructions()
+				if not is_label_definition(line.get_instr())
+				and not is_define(line.get_instr())])
+
+def add_bb_distances(
+		dist: DistanceContainer,
+		basic_block: BasicBlock,
+		bb_dist: int,
+		targets: Set[int] = None
+	) -> List[int]:
+	"""
+	Assigns a distance to each instruction of a basic block according to the
+	distance of the basic block. For a target basic block, `targets` are the
+	lines of its target instructions (see `target_lines`): an instruction gets
+	its distance to the next target, and the instructions after the last one 
+	get no distance.
+	Returns the lines which got a distance.
+	"""
+	assigned: List[int] = []
+	if targets == None:
+		dist_value: int = bb_dist
+		for line in basic_block.get_llvm_instructions():
+			# we only attribuate a distance for instructions executed by KLEE
+			if not is_label_definition(line.get_instr()) and not is_define(line.get_instr()):
+				dist_value -= 1
+				dist.add_element(line.get_line(), dist_value)
+				assigned.append(line.get_line())
+		return assigned
+
+	# distances of the instructions up to the last target, walking backward
+	# from it (the distance of the first target is the one of the basic block
+	# minus the instructions up to this target)
+	first_target: int = 0
+	for line in basic_block.get_llvm_instructions():
+		if not is_label_definition(line.get_instr()) and not is_define(line.get_instr()):
+			first_target += 1
+		if line.get_line() in targets:
+			break
+	target_value: int = bb_dist - first_target
+
+	values: Mapping[int, int] = {}
+	dist_value: int | None = None
+	for line in reversed(basic_block.get_llvm_instructions()):
+		if line.get_line() in targets:
+			dist_value = target_value - 1
+		if (dist_value != None and not is_label_definition(line.get_instr())
+			and not is_define(line.get_instr())):
+			dist_value += 1
+			values[line.get_line()] = dist_value
+	for line in basic_block.get_llvm_instructions():
+		if line.get_line() in values:
+			dist.add_element(line.get_line(), values[line.get_line()])
+			assigned.append(line.get_line())
+	return assigned
+
+def target_lines(
+		cfgs: List[CFG],
+		targets: List[Tuple]
+	) -> Mapping[Tuple[str, int], Set[int]]:
+	"""
+	Returns the lines of the target instructions of each target basic block: 
+	the line of a (cfg_name, basic_block_id, line) target, or the last 
+	instruction of the basic block for a (cfg_name, basic_block_id) target
+	"""
+	lines: Mapping[Tuple[str, int], Set[int]] = {}
+	for target in targets:
+		if len(target) == 3:
+			line: int = target[2]
+		else:
+			basic_block: BasicBlock = get_cfg_by_name(cfgs, target[0]).get_basic_block(target[1])
+			line = basic_block.get_llvm_instr(-1).get_line()
+		lines.setdefault((target[0], target[1]), set()).add(line)
+	return lines
+
+def target_distance(basic_block: BasicBlock, targets: Set[int]) -> int:
+	"""
+	Returns the distance of a target basic block: its weight, without the 
+	instructions following its first target instruction
+	"""
+	after: int = 0
+	for line in reversed(basic_block.get_llvm_instructions()):
+		if line.get_line() in targets:
+			break
+		if not is_label_definition(line.get_instr()) and not is_define(line.get_instr()):
+			after += 1
+	return basic_block.weight() - after
+
+def entry_line(basic_block: BasicBlock) -> int:
+	"""
+	Returns the line of the first instruction of a basic block executed by KLEE
+	"""
+	for line in basic_block.get_llvm_instructions():
+		if not is_label_definition(line.get_instr()) and not is_define(line.get_instr()):
+			return line.get_line()
+	return basic_block.get_llvm_instr(0).get_line()
+
+def add_bb_next_hop(
+		next_hops: NextHopContainer,
+		cfgs: List[CFG],
+		basic_block: BasicBlock,
+		hop: Tuple[str, str, int],
+		lines: List[int] = None
+	) -> None:
+	"""
+	Assigns the next hop of a basic block (see `explore_backward`) to each of 
+	its instructions (only to `lines` if given): the entry line of the next 
+	basic block and the edge kind
+	"""
+	edge, cfg_name, bb_id = hop
+	next_line: int = entry_line(get_cfg_by_name(cfgs, cfg_name).get_basic_block(bb_id))
+	for line in basic_block.get_llvm_instructions():
+		if lines != None and line.get_line() not in lines:
+			continue
+		if not is_label_definition(line.get_instr()) and not is_define(line.get_instr()):
+			next_hops.add_element(line.get_line(), next_line, edge)
+	return None
 
 def find_target(cfgs: List[CFG]) -> Tuple[str, int]:
 	"""
@@ -136,6 +429,34 @@ def find_target(cfgs: List[CFG]) -> Tuple[str, int]:
 
 	return "", -1 # no target found
 
+def default_targets(cfgs: List[CFG]) -> List[Tuple[str, int]]:
+	"""
+	Returns the default targets: the first call to klee_reach (if exists)
+	"""
+	target_func: str
+	target_bb_id: int
+	target_func, target_bb_id = find_target(cfgs)
+	return [] if target_func == "" else [(target_func, target_bb_id)]
+
+def find_targets_by_lines(
+		cfgs: List[CFG],
+		lines: List[int]
+	) -> Mapping[int, Tuple[str, int, int]]:
+	"""
+	Returns, for each line of `lines` containing an instruction in the LLVM 
+	file, the target (cfg_name, basic_block_id, line) of this instruction
+	"""
+	wanted = set(lines)
+	targets: Mapping[int, Tuple[str, int, int]] = {}
+	for cfg in cfgs:
+		for bb in cfg.get_basic_blocks():
+			for llvm_instr in bb.get_llvm_instructions():
+				if llvm_instr.get_line() in wanted:
+					targets[llvm_instr.get_line()] = (cfg.get_name(), bb.get_id(),
+													  llvm_instr.get_line())
+
+	return targets
+
 def add_summary(
 		summaries: Mapping[str, int],
 		target_bb: BasicBlock
@@ -179,8 +500,8 @@ def take_call_path(
 			next_bb = next_callret[1]
 
 			if not visited[next_cfg_id][next_bb]:
-				next_bb_size: int = cfgs[next_cfg_id].get_basic_block(next_bb).size()
-				value = v + next_bb_size
+				next_bb_weight: int = cfgs[next_cfg_id].get_basic_block(next_bb).weight()
+				value = v + next_bb_weight
 
 				if has_took_ret or path == "ret":
 					new_took_ret = True
@@ -188,7 +509,8 @@ def take_call_path(
 					new_took_ret = False
 
 				heapq.heappush(heap,
-				   			   (value, ((next_cfg_name), next_bb, new_took_ret)))
+				   			   (value, ((next_cfg_name), next_bb, new_took_ret),
+								(path, current_cfg.get_name(), current_bb.get_id())))
 				visited[next_cfg_id][next_bb] = True
 
 	return heap, visited
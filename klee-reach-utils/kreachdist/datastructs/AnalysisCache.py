@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from kreachdist.datastructs.CFG import CFG
+
+import pickle
+from typing import List, Mapping, Tuple
+
+class AnalysisCache:
+	"""
+	This class keeps the results of the previous analysis of a LLVM file, so
+	that a new analysis of the same file (after a small edit in the source code)
+	only redoes the work for the functions that have changed.
+
+	Each defined function is identified by its name and by the hash of its body
+	(see `hash_function`). For each function, the cache stores:
+	- the line of its define statement (to remap line numbers),
+	- its CFG (with the line numbers of the previous analysis),
+	- its summary,
+	- the distances of its instructions, with lines relative to its define
+	  statement.
+	The settings of the distance computation (targets, limits) and the cutoff of
+	these distances are stored too.
+	"""
+
+	def __init__(self: AnalysisCache) -> AnalysisCache:
+		# ordered list of (function name, hash of the function body)
+		self.layout: List[Tuple[str, str]] = []
+
+		# hash of the body of each function
+		self.hashes: Mapping[str, str] = {}
+
+		# line of the define statement of each function
+		self.start_lines: Mapping[str, int] = {}
+
+		self.cfgs: Mapping[str, CFG] = {}
+
+		self.summaries: Mapping[str, int] = {}
+
+		# settings of the distance computation: targets (None for klee_reach())
+		# and limits
+		self.settings: Tuple | None = None
+
+		# distance beyond which the distances were cut (None if not cut)
+		self.cutoff: int | None = None
+
+		# (function name, line - start_line, distance) in the order of the
+		# .dist file
+		self.distances: List[Tuple[str, int, int]] = []
+
+	def add_function(
+			self: AnalysisCache,
+			function_name: str,
+			digest: str,
+			start_line: int,
+			cfg: CFG
+		) -> None:
+		"""
+		Adds a function (in the order of the LLVM file) to the cache
+		"""
+		self.layout.append((function_name, digest))
+		self.hashes[function_name] = digest
+		self.start_lines[function_name] = start_line
+		self.cfgs[function_name] = cfg
+		return None
+
+	def get_hash(self: AnalysisCache, function_name: str) -> str | None:
+		"""
+		Returns the hash of function_name body (if the function is defined)
+		"""
+		return self.hashes.get(function_name)
+
+	def get_layout(self: AnalysisCache) -> List[Tuple[str, str]]:
+		"""
+		Gets the ordered list of (function name, hash)
+		"""
+		return self.layout
+
+	def get_start_line(self: AnalysisCache, function_name: str) -> int:
+		"""
+		Gets the line of the define statement of function_name
+		"""
+		return self.start_lines[function_name]
+
+	def get_cfg(self: AnalysisCache, function_name: str) -> CFG:
+		"""
+		Gets the cached CFG of function_name
+		"""
+		return self.cfgs[function_name]
+
+	def set_summaries(self: AnalysisCache, summaries: Mapping[str, int]) -> None:
+		"""
+		Sets the summaries of the analysis
+		"""
+		self.summaries = summaries
+		return None
+
+	def get_summaries(self: AnalysisCache) -> Mapping[str, int]:
+		"""
+		Gets the summaries of the analysis
+		"""
+		return self.summaries
+
+	def set_settings(self: AnalysisCache, settings: Tuple) -> None:
+		"""
+		Sets the settings of the distance computation
+		"""
+		self.settings = settings
+		return None
+
+	def get_settings(self: AnalysisCache) -> Tuple | None:
+		"""
+		Gets the settings of the distance computation
+		"""
+		return self.settings
+
+	def set_cutoff(self: AnalysisCache, cutoff: int | None) -> None:
+		"""
+		Sets the cutoff of the distances
+		"""
+		self.cutoff = cutoff
+		return None
+
+	def get_cutoff(self: AnalysisCache) -> int | None:
+		"""
+		Gets the cutoff of the distances
+		"""
+		return self.cutoff
+
+	def set_distances(
+			self: AnalysisCache,
+			distances: List[Tuple[str, int, int]]
+		) -> None:
+		"""
+		Sets the relative distances of the analysis
+		"""
+		self.distances = distances
+		return None
+
+	def get_distances(self: AnalysisCache) -> List[Tuple[str, int, int]]:
+		"""
+		Gets the relative distances of the analysis
+		"""
+		return self.distances
+
+	@staticmethod
+	def load(file_name: str) -> AnalysisCache:
+		"""
+		Loads a cache from a file. An empty cache is returned if the file does
+		not exist or cannot be read.
+		"""
+		try:
+			with open(file_name, "rb") as f:
+				cache = pickle.load(f)
+		except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+			return AnalysisCache()
+		if not isinstance(cache, AnalysisCache):
+			return AnalysisCache()
+		return cache
+
+	def save(self: AnalysisCache, file_name: str) -> None:
+		"""
+		Writes the cache in a file
+		"""
+		with open(file_name, "wb") as f:
+			pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+		return None
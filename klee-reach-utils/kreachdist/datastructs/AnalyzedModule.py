@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from kreachdist.datastructs.Landmarks import Landmarks
+from kreachdist.datastructs.Program import Program
+from kreachdist.datastructs.Supergraph import Supergraph
+
+from typing import Mapping, Tuple
+
+class AnalyzedModule:
+	"""
+	This class gathers everything that only depends on the LLVM file (and not
+	on the target): the parsed program, the function summaries and the 
+	supergraph (and the landmarks, once needed). It is kept in memory by the distance server so that a new 
+	target in the same file only costs a distance computation.
+
+	The stamp (modification time and size of the file when it was parsed) is 
+	used to detect a file that has been rewritten since.
+	"""
+	def __init__(
+			self: AnalyzedModule,
+			program: Program,
+			summaries: Mapping[str, int],
+			supergraph: Supergraph,
+			stamp: Tuple[int, int]
+		) -> AnalyzedModule:
+		self.program: Program = program
+		self.summaries: Mapping[str, int] = summaries
+		self.supergraph: Supergraph = supergraph
+		self.stamp: Tuple[int, int] = stamp
+
+		# landmarks for approximate distances (computed on first use)
+		self.landmarks: Landmarks | None = None
+
+	def get_program(self: AnalyzedModule) -> Program:
+		"""
+		Gets the parsed program
+		"""
+		return self.program
+
+	def get_summaries(self: AnalyzedModule) -> Mapping[str, int]:
+		"""
+		Gets the function summaries
+		"""
+		return self.summaries
+
+	def get_supergraph(self: AnalyzedModule) -> Supergraph:
+		"""
+		Gets the supergraph
+		"""
+		return self.supergraph
+
+	def get_stamp(self: AnalyzedModule) -> Tuple[int, int]:
+		"""
+		Gets the (modification time, size) of the file when it was parsed
+		"""
+		return self.stamp
+
+	def get_landmarks(self: AnalyzedModule) -> Landmarks | None:
+		"""
+		Gets the landmarks (None if not computed yet)
+		"""
+		return self.landmarks
+
+	def set_landmarks(self: AnalyzedModule, landmarks: Landmarks) -> None:
+		"""
+		Sets the landmarks
+		"""
+		self.landmarks = landmarks
+		return None
@@ -36,6 +36,13 @@ class BasicBlock:
 		# KLEE but collected in llvm_instructions for debugging purpose)
 		self.ignored_instructions: int = 0
 
+		# cost observed by KLEE on top of the size (see `weight`)
+		self.extra_weight: int = 0
+
+		# True when the BB cannot be left anymore: it has been pruned, or all 
+		# its successors have been (see prune.py)
+		self.dead_end: bool = False
+
 	def get_id(self: BasicBlock) -> int:
 		"""
 		Returns the BB's id
@@ -118,6 +125,34 @@ class BasicBlock:
 		"""
 		return len(self.llvm_instructions) - self.ignored_instructions
 
+	def set_extra_weight(self: BasicBlock, extra_weight: int) -> None:
+		"""
+		Sets the cost added to the size of the BB in distances (e.g. solver
+		time observed in run.istats)
+		"""
+		self.extra_weight = extra_weight
+		return None
+
+	def weight(self: BasicBlock) -> int:
+		"""
+		Gets BB's weight in distances: its size plus its extra weight
+		"""
+		return self.size() + self.extra_weight
+
+	def set_dead_end(self: BasicBlock) -> None:
+		"""
+		Marks the BB as a dead end: having no successor does not make it an 
+		exit point of the function
+		"""
+		self.dead_end = True
+		return None
+
+	def is_dead_end(self: BasicBlock) -> bool:
+		"""
+		Checks if the BB is a dead end
+		"""
+		return self.dead_end
+
 	def new_ignored_instruction(self: BasicBlock) -> None:
 		"""
 		Increments ignored_instructions
@@ -10,11 +10,12 @@ class CFG:
 	
 	Some basic blocks contain a label: labels are used to identify the part of 
 	the code we jump on when we follow a br instruction. Because some br 
-	instructions refer to labels that are not yet seen in parsing, it is not 
-	possible to represent the edges of the CFG in a single pass. That is why we 
-	first construct a mapping table between the labels in the LLVM code and the 
-	identifiers of the corresponding basic blocks. This table will be used in a 
-	second step to build the edges.
+	instructions refer to labels that are not yet seen in parsing, the edges of 
+	these jumps cannot always be added as soon as they are parsed. That is why 
+	we construct a mapping table between the labels in the LLVM code and the 
+	identifiers of the corresponding basic blocks while parsing: jumps to 
+	labels already in the table are resolved at once, the others when the end 
+	of the function is reached.
 	
 	A CFG is identified by a unique identifier and name (both of which are 
 	useful depending on how we want to identify it).
@@ -69,6 +70,23 @@ class CFG:
 		"""
 		return self.id
 
+	def set_id(self: CFG, id: int) -> None:
+		"""
+		Sets the id of the CFG
+		"""
+		self.id = id
+		return None
+
+	def shift_lines(self: CFG, offset: int) -> None:
+		"""
+		Moves every LLVM instruction of the CFG `offset` lines further in the 
+		LLVM file (used when the function is reused from a previous analysis)
+		"""
+		for bb in self.basic_blocks:
+			for llvm_instr in bb.get_llvm_instructions():
+				llvm_instr.set_line(llvm_instr.get_line() + offset)
+		return None
+
 	def set_name(self: CFG, name: str) -> None:
 		"""
 		Sets the name of the CFG
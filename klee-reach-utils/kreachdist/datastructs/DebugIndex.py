@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import List, Mapping, Set, Tuple
+
+class DebugIndex:
+	"""
+	This class indexes the debug information of a LLVM file (!dbg attachments
+	and their !DILocation metadata): it maps source locations to the lines of
+	the LLVM file, so that targets can be given as 'file.c:line' or as
+	'function+offset' (an offset in source lines from the line of the function
+	definition).
+
+	Source files are identified by their path (directory and file name, as in
+	the !DIFile metadata); a file given by the user matches every path ending
+	with it.
+	"""
+	def __init__(self: DebugIndex) -> DebugIndex:
+		# (source file, source line) -> lines of the instructions in the LLVM
+		# file
+		self.instructions: Mapping[Tuple[str, int], List[int]] = {}
+
+		# source files of the LLVM file
+		self.files: Set[str] = set()
+
+		# function name -> (source file, source line of the definition, first
+		# line, last line of the function in the LLVM file)
+		self.functions: Mapping[str, Tuple[str, int, int, int]] = {}
+
+	def add_instruction(
+			self: DebugIndex,
+			line: int,
+			source_file: str,
+			source_line: int
+		) -> None:
+		"""
+		Adds an instruction of the LLVM file and its source location
+		"""
+		self.instructions.setdefault((source_file, source_line), []).append(line)
+		self.files.add(source_file)
+		return None
+
+	def add_function(
+			self: DebugIndex,
+			name: str,
+			source_file: str,
+			source_line: int,
+			first_line: int,
+			last_line: int
+		) -> None:
+		"""
+		Adds a function defined in the LLVM file
+		"""
+		self.functions[name] = (source_file, source_line, first_line, last_line)
+		return None
+
+	def find_source_line(self: DebugIndex, source_file: str, source_line: int) -> List[int]:
+		"""
+		Returns the lines of the LLVM file of the instructions at a source
+		location
+		"""
+		lines: List[int] = []
+		for f in self.files:
+			if f == source_file or f.endswith("/" + source_file):
+				lines += self.instructions.get((f, source_line), [])
+		return sorted(lines)
+
+	def find_function_offset(self: DebugIndex, name: str, offset: int) -> List[int]:
+		"""
+		Returns the lines of the LLVM file of the instructions of a function
+		located `offset` source lines after the definition of the function
+		"""
+		if not name.startswith("@"):
+			name = "@" + name
+		function = self.functions.get(name)
+		if function == None:
+			return []
+		source_file, source_line, first_line, last_line = function
+		return [line for line in self.instructions.get((source_file, source_line + offset), [])
+				if first_line <= line <= last_line]
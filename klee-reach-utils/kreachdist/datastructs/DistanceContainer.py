@@ -1,6 +1,6 @@
 from __future__ import annotations
 import math
-from typing import List
+from typing import List, Tuple
 
 class DistanceContainer:
 	"""
@@ -9,23 +9,64 @@ class DistanceContainer:
 	"""
 
 	def __init__(self: DistanceContainer) -> DistanceContainer:
-		self.data: List[str] = []
+		# (line, distance) pairs
+		self.data: List[Tuple[int, int]] = []
+
+		# when the computation has been cut, distance beyond which the 
+		# instructions are missing (None if not cut)
+		self.cutoff: int | None = None
 
 	def add_element(self: DistanceContainer, line: int, distance: int) -> None:
 		"""
 		Adds an element to the container
 		"""
 		if distance != math.inf:
-			self.data.append(f"{line}:{distance}")
+			self.data.append((line, distance))
 		return None
 
+	def get_elements(self: DistanceContainer) -> List[Tuple[int, int]]:
+		"""
+		Returns all (line, distance) pairs of the container
+		"""
+		return self.data
+
+	def set_cutoff(self: DistanceContainer, cutoff: int | None) -> None:
+		"""
+		Records that the distances greater than cutoff have not been computed
+		"""
+		self.cutoff = cutoff
+		return None
+
+	def get_cutoff(self: DistanceContainer) -> int | None:
+		"""
+		Gets the cutoff of the distances (None if not cut)
+		"""
+		return self.cutoff
+
+	def header(self: DistanceContainer) -> str:
+		"""
+		Returns the header of the .dist file: lines starting with '#' which
+		describe the map (e.g. '#cutoff:D' when the map is truncated)
+		"""
+		if self.cutoff != None:
+			return f"#cutoff:{self.cutoff}\n"
+		return ""
+
+	def to_dist_format(self: DistanceContainer) -> str:
+		"""
+		Returns the content of the .dist file
+		"""
+		return self.header() + "".join(f"{line}:{distance}\n"
+									   for line, distance in self.data)
+
 	def write_in_file(self, file_name):
 		"""
 		Outputs the container in a file (.dist)
 		"""
 		f = open(file_name + ".dist", 'w')
-		for line in self.data:
-			f.write(line + "\n")
+		f.write(self.header())
+		for line, distance in self.data:
+			f.write(f"{line}:{distance}\n")
 		f.close()
 		return None
 
@@ -33,6 +74,6 @@ class DistanceContainer:
 		"""
 		Displays the container
 		"""
-		for e in self.data:
-			print(e)
+		for line, distance in self.data:
+			print(f"{line}:{distance}")
 		return None
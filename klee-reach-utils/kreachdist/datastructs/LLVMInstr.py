@@ -22,3 +22,10 @@ class LLVMInstr:
 		Gets the line_number field of the LLVMInstr
 		"""
 		return self.line_number
+
+	def set_line(self: LLVMInstr, line_number: int) -> None:
+		"""
+		Sets the line_number field of the LLVMInstr
+		"""
+		self.line_number = line_number
+		return None
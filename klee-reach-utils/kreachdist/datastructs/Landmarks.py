@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pickle
+from typing import List, Mapping, Tuple
+
+class Landmarks:
+	"""
+	This class stores the distances from every basic block of a program to a 
+	few landmark basic blocks (ALT approach). These distances only depend on 
+	the program, thus they are computed once and can be used for any target.
+
+	By the triangle inequality, for a basic block b, a target t and a landmark 
+	L: d(b, L) <= d(b, t) + d(t, L) - size(t) (t is counted in both distances),
+	which yields a lower bound of d(b, t) from two lookups per landmark.
+
+	The stamp (modification time and size of the LLVM file) is used to detect
+	landmarks computed for an older version of the file.
+	"""
+	def __init__(
+			self: Landmarks,
+			stamp: Tuple[int, int]
+		) -> Landmarks:
+		self.stamp: Tuple[int, int] = stamp
+
+		# (cfg_name, basic_block_id) of each landmark
+		self.landmarks: List[Tuple[str, int]] = []
+
+		# distances[i][(cfg_name, basic_block_id)] is the distance from a basic
+		# block to the i-th landmark (missing when the landmark is unreachable)
+		self.distances: List[Mapping[Tuple[str, int], int]] = []
+
+	def add_landmark(
+			self: Landmarks,
+			landmark: Tuple[str, int],
+			distances: Mapping[Tuple[str, int], int]
+		) -> None:
+		"""
+		Adds a landmark and the distances of all basic blocks to it
+		"""
+		self.landmarks.append(landmark)
+		self.distances.append(distances)
+		return None
+
+	def get_landmarks(self: Landmarks) -> List[Tuple[str, int]]:
+		"""
+		Gets the landmarks
+		"""
+		return self.landmarks
+
+	def get_distances(self: Landmarks) -> List[Mapping[Tuple[str, int], int]]:
+		"""
+		Gets the distances to each landmark
+		"""
+		return self.distances
+
+	def get_stamp(self: Landmarks) -> Tuple[int, int]:
+		"""
+		Gets the (modification time, size) of the LLVM file
+		"""
+		return self.stamp
+
+	def size(self: Landmarks) -> int:
+		"""
+		Gets the number of landmarks
+		"""
+		return len(self.landmarks)
+
+	@staticmethod
+	def load(file_name: str) -> Landmarks | None:
+		"""
+		Loads landmarks from a file (None if the file does not exist or cannot
+		be read)
+		"""
+		try:
+			with open(file_name, "rb") as f:
+				landmarks = pickle.load(f)
+		except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+			return None
+		if not isinstance(landmarks, Landmarks):
+			return None
+		return landmarks
+
+	def save(self: Landmarks, file_name: str) -> None:
+		"""
+		Writes the landmarks in a file
+		"""
+		with open(file_name, "wb") as f:
+			pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+		return None
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from kreachdist.datastructs.AnalyzedModule import AnalyzedModule
+
+from collections import OrderedDict
+from typing import Tuple
+
+class ModuleCache:
+	"""
+	A LRU cache of analyzed modules, indexed by the path of their LLVM file.
+	When more than `max_modules` modules are stored, the least recently used
+	one is dropped.
+	"""
+	def __init__(self: ModuleCache, max_modules: int) -> ModuleCache:
+		self.max_modules: int = max_modules
+		self.modules: OrderedDict[str, AnalyzedModule] = OrderedDict()
+
+	def get(
+			self: ModuleCache,
+			file_name: str,
+			stamp: Tuple[int, int]
+		) -> AnalyzedModule | None:
+		"""
+		Returns the module analyzed from file_name, if it is cached and the 
+		file has not changed since
+		"""
+		module: AnalyzedModule | None = self.modules.get(file_name)
+		if module == None:
+			return None
+		if module.get_stamp() != stamp: # outdated
+			del self.modules[file_name]
+			return None
+		self.modules.move_to_end(file_name)
+		return module
+
+	def put(self: ModuleCache, file_name: str, module: AnalyzedModule) -> None:
+		"""
+		Adds a module to the cache
+		"""
+		self.modules[file_name] = module
+		self.modules.move_to_end(file_name)
+		while len(self.modules) > self.max_modules:
+			self.modules.popitem(last=False)
+		return None
+
+	def size(self: ModuleCache) -> int:
+		"""
+		Gets the number of cached modules
+		"""
+		return len(self.modules)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+from typing import List, Set, Tuple
+
+class NextHopContainer:
+	"""
+	This class represents the shortest-path tree towards the target: for each
+	instruction, the first instruction of the next basic block on its shortest
+	path and the kind of edge leading there ("succ", "call", "ret", or "target"
+	when the instruction belongs to a target basic block)
+	"""
+
+	def __init__(self: NextHopContainer) -> NextHopContainer:
+		# (line, next line, edge) triples
+		self.data: List[Tuple[int, int, str]] = []
+
+		# lines already in the container
+		self.lines: Set[int] = set()
+
+		# cutoff of the distances the tree comes with (None if not cut)
+		self.cutoff: int | None = None
+
+	def add_element(
+			self: NextHopContainer,
+			line: int,
+			next_line: int,
+			edge: str
+		) -> None:
+		"""
+		Adds an element to the container. A target basic block in a loop is 
+		reached twice: only its first next hop (the target itself) is kept.
+		"""
+		if line not in self.lines:
+			self.lines.add(line)
+			self.data.append((line, next_line, edge))
+		return None
+
+	def get_elements(self: NextHopContainer) -> List[Tuple[int, int, str]]:
+		"""
+		Returns all (line, next line, edge) triples of the container
+		"""
+		return self.data
+
+	def set_cutoff(self: NextHopContainer, cutoff: int | None) -> None:
+		"""
+		Records that the instructions farther than cutoff are missing
+		"""
+		self.cutoff = cutoff
+		return None
+
+	def get_cutoff(self: NextHopContainer) -> int | None:
+		"""
+		Gets the cutoff of the tree (None if not cut)
+		"""
+		return self.cutoff
+
+	def header(self: NextHopContainer) -> str:
+		"""
+		Returns the header of the .next file (same as the .dist file one)
+		"""
+		if self.cutoff != None:
+			return f"#cutoff:{self.cutoff}\n"
+		return ""
+
+	def to_next_format(self: NextHopContainer) -> str:
+		"""
+		Returns the content of the .next file: 'line:next_line:edge' lines, in
+		the order of the .dist file
+		"""
+		return self.header() + "".join(f"{line}:{next_line}:{edge}\n"
+									   for line, next_line, edge in self.data)
+
+	def write_in_file(self: NextHopContainer, file_name: str) -> None:
+		"""
+		Outputs the container in a file (.next)
+		"""
+		with open(file_name + ".next", "w") as f:
+			f.write(self.to_next_format())
+		return None
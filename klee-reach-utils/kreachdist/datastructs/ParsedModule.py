@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from kreachdist.datastructs.Program import Program
+
+import pickle
+from typing import Tuple
+
+class ParsedModule:
+	"""
+	This class keeps the parsed program of a LLVM module linked with others
+	(see `link.py`), so that an unchanged module (typically a library) is not
+	parsed again at the next analysis.
+
+	The stamp (modification time and size of the LLVM file) is used to detect
+	a program parsed from an older version of the file. The line of the last
+	instruction of the file is kept to number the lines of the linked modules.
+	"""
+	def __init__(
+			self: ParsedModule,
+			stamp: Tuple[int, int],
+			program: Program,
+			last_line: int
+		) -> ParsedModule:
+		self.stamp: Tuple[int, int] = stamp
+		self.program: Program = program
+		self.last_line: int = last_line
+
+	def get_stamp(self: ParsedModule) -> Tuple[int, int]:
+		"""
+		Gets the (modification time, size) of the LLVM file
+		"""
+		return self.stamp
+
+	def get_program(self: ParsedModule) -> Program:
+		"""
+		Gets the parsed program of the module
+		"""
+		return self.program
+
+	def get_last_line(self: ParsedModule) -> int:
+		"""
+		Gets the line of the last instruction of the LLVM file
+		"""
+		return self.last_line
+
+	@staticmethod
+	def load(file_name: str) -> ParsedModule | None:
+		"""
+		Loads a parsed module from a file (None if the file does not exist or
+		cannot be read)
+		"""
+		try:
+			with open(file_name, "rb") as f:
+				module = pickle.load(f)
+		except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+			return None
+		if not isinstance(module, ParsedModule):
+			return None
+		return module
+
+	def save(self: ParsedModule, file_name: str) -> None:
+		"""
+		Writes the parsed module in a file
+		"""
+		with open(file_name, "wb") as f:
+			pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+		return None
@@ -14,6 +14,8 @@ class Program:
 
 		# All functions that are defined in the LLVM file
 		self.defined_functions: Mapping[str, bool] = {}
+		# All functions that are declared (defined elsewhere) in the LLVM file
+		self.declared_functions: Mapping[str, bool] = {}
 
 	def add_cfg(self: Program, cfg: CFG) -> None:
 		"""
@@ -40,3 +42,16 @@ class Program:
 		Gets all program's defined functions
 		"""
 		return self.defined_functions
+
+	def add_declared_function(self: Program, function_name: str) -> None:
+		"""
+		Takes a declared function into account
+		"""
+		self.declared_functions[function_name] = True
+		return None
+
+	def get_declared_functions(self: Program) -> Mapping[str, bool]:
+		"""
+		Gets all program's declared functions
+		"""
+		return self.declared_functions
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import pickle
+from typing import List, Mapping, Set, Tuple
+
+class ShortestPathTree:
+	"""
+	This class stores the shortest-path tree of a distance computation, so that
+	the distances can be updated when basic blocks or edges are pruned (see
+	prune.py) instead of being computed again.
+
+	For each reached basic block (cfg_name, basic_block_id), the tree stores
+	its distance, its next hop (edge, cfg_name, basic_block_id) as yielded by
+	`explore_backward`, and whether its shortest path takes a return edge
+	(after which call edges cannot be taken anymore).
+
+	The tree also keeps what it depends on: the stamp of the LLVM file, the
+	targets, the summaries, and the basic blocks and edges pruned so far.
+	"""
+	def __init__(
+			self: ShortestPathTree,
+			stamp: Tuple[int, int],
+			targets: List[Tuple]
+		) -> ShortestPathTree:
+		self.stamp: Tuple[int, int] = stamp
+		self.targets: List[Tuple] = targets
+
+		# block -> (distance, has_took_ret, next hop)
+		self.blocks: Mapping[Tuple[str, int], Tuple[int, bool, Tuple[str, str, int]]] = {}
+
+		self.summaries: Mapping[str, int] = {}
+
+		self.removed_blocks: Set[Tuple[str, int]] = set()
+		self.removed_edges: Set[Tuple[Tuple[str, int], Tuple[str, int]]] = set()
+
+	def add_block(
+			self: ShortestPathTree,
+			block: Tuple[str, int],
+			distance: int,
+			hop: Tuple[str, str, int]
+		) -> None:
+		"""
+		Adds a reached basic block (only its first distance is kept). Its next
+		hop must already be in the tree.
+		"""
+		if block in self.blocks:
+			return None
+		edge, cfg_name, bb_id = hop
+		has_took_ret: bool = edge == "ret" or (
+			edge != "target" and self.blocks[(cfg_name, bb_id)][1])
+		self.blocks[block] = (distance, has_took_ret, hop)
+		return None
+
+	def remove_block(self: ShortestPathTree, block: Tuple[str, int]) -> None:
+		"""
+		Removes a basic block from the tree (its distance has to be recomputed)
+		"""
+		self.blocks.pop(block, None)
+		return None
+
+	def get_block(
+			self: ShortestPathTree,
+			block: Tuple[str, int]
+		) -> Tuple[int, bool, Tuple[str, str, int]] | None:
+		"""
+		Gets the (distance, has_took_ret, next hop) of a basic block (None if
+		the basic block does not reach the targets)
+		"""
+		return self.blocks.get(block)
+
+	def get_blocks(
+			self: ShortestPathTree
+		) -> Mapping[Tuple[str, int], Tuple[int, bool, Tuple[str, str, int]]]:
+		"""
+		Gets all the basic blocks of the tree
+		"""
+		return self.blocks
+
+	def get_stamp(self: ShortestPathTree) -> Tuple[int, int]:
+		"""
+		Gets the (modification time, size) of the LLVM file
+		"""
+		return self.stamp
+
+	def get_targets(self: ShortestPathTree) -> List[Tuple]:
+		"""
+		Gets the targets of the distances
+		"""
+		return self.targets
+
+	def set_summaries(self: ShortestPathTree, summaries: Mapping[str, int]) -> None:
+		"""
+		Sets the summaries the distances were computed with
+		"""
+		self.summaries = summaries
+		return None
+
+	def get_summaries(self: ShortestPathTree) -> Mapping[str, int]:
+		"""
+		Gets the summaries the distances were computed with
+		"""
+		return self.summaries
+
+	def add_removals(
+			self: ShortestPathTree,
+			blocks: Set[Tuple[str, int]],
+			edges: Set[Tuple[Tuple[str, int], Tuple[str, int]]]
+		) -> None:
+		"""
+		Records pruned basic blocks and edges
+		"""
+		self.removed_blocks |= blocks
+		self.removed_edges |= edges
+		return None
+
+	def get_removed_blocks(self: ShortestPathTree) -> Set[Tuple[str, int]]:
+		"""
+		Gets the basic blocks pruned so far
+		"""
+		return self.removed_blocks
+
+	def get_removed_edges(
+			self: ShortestPathTree
+		) -> Set[Tuple[Tuple[str, int], Tuple[str, int]]]:
+		"""
+		Gets the edges pruned so far
+		"""
+		return self.removed_edges
+
+	@staticmethod
+	def load(file_name: str) -> ShortestPathTree | None:
+		"""
+		Loads a tree from a file (None if the file does not exist or cannot be
+		read)
+		"""
+		try:
+			with open(file_name, "rb") as f:
+				tree = pickle.load(f)
+		except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+			return None
+		if not isinstance(tree, ShortestPathTree):
+			return None
+		return tree
+
+	def save(self: ShortestPathTree, file_name: str) -> None:
+		"""
+		Writes the tree in a file
+		"""
+		with open(file_name, "wb") as f:
+			pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+		return None
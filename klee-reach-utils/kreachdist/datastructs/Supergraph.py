@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import List, Mapping, Tuple
+
+class Supergraph:
+	"""
+	The supergraph links the CFGs of a program together with call edges (from
+	a basic block ending with a call to the first basic block of the called
+	function) and return edges (from a basic block ending with a ret to the
+	basic block following the call in the caller).
+
+	Distances are computed backward from the target, thus only the transpose 
+	graphs of G_call and G_ret are kept. They only depend on the CFGs, so the 
+	same supergraph can be used for any target.
+	"""
+	def __init__(
+			self: Supergraph,
+			g_call_t: Mapping[Tuple[str, int], List[Tuple[str, int]]],
+			g_ret_t: Mapping[Tuple[str, int], List[Tuple[str, int]]]
+		) -> Supergraph:
+		self.g_call_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = g_call_t
+		self.g_ret_t: Mapping[Tuple[str, int], List[Tuple[str, int]]] = g_ret_t
+
+	def get_g_call_t(self: Supergraph) -> Mapping[Tuple[str, int], List[Tuple[str, int]]]:
+		"""
+		Gets the transpose graph of G_call
+		"""
+		return self.g_call_t
+
+	def get_g_ret_t(self: Supergraph) -> Mapping[Tuple[str, int], List[Tuple[str, int]]]:
+		"""
+		Gets the transpose graph of G_ret
+		"""
+		return self.g_ret_t
@@ -0,0 +1,163 @@
+from kreachdist.datastructs.DebugIndex import DebugIndex
+from kreachdist.utils.misc import open_llvm_file
+from kreachdist.utils.regex import is_define, is_end_of_define, extract_called_function
+
+import os
+import re
+from typing import List, Mapping, Tuple
+
+# Targets can be given as:
+#   LINE            a line of the LLVM file
+#   FILE:LINE       a line of a source file (e.g. main.c:42)
+#   FUNCTION+OFFSET the source line OFFSET lines after the definition of
+#                   FUNCTION (e.g. parse+3)
+# Source locations are resolved through the debug information of the LLVM
+# file (the program has to be compiled with -g): the index is only built when
+# such a target is given.
+
+DBG_ATTACHMENT = re.compile(r"!dbg !(\d+)")
+METADATA = re.compile(r"^!(\d+) = (?:distinct )?!(\w+)\((.*)\)\s*$")
+FIELD = re.compile(r"(\w+): (\"(?:[^\"\\]|\\.)*\"|[^,]+)")
+
+class TargetError(Exception):
+	"""
+	Raised when a target cannot be resolved
+	"""
+	pass
+
+def metadata_fields(fields: str) -> Mapping[str, str]:
+	"""
+	Returns the fields of a specialized metadata node, e.g.
+	'line: 8, column: 6, scope: !9' -> {'line': '8', 'column': '6', 'scope': '!9'}
+	"""
+	return {name: value.strip().strip('"') for name, value in FIELD.findall(fields)}
+
+def build_debug_index(file_name: str) -> DebugIndex:
+	"""
+	Reads a LLVM file once and indexes the source location of each
+	instruction and the source line of each function definition
+	"""
+	# !dbg attachments: (line, location id) of the instructions and
+	# (name, subprogram id, first line, last line) of the functions
+	attachments: List[Tuple[int, int]] = []
+	functions: List[Tuple[str, int, int, int]] = []
+	# metadata id -> (kind, fields)
+	metadata: Mapping[int, Tuple[str, Mapping[str, str]]] = {}
+
+	function: Tuple[str, int, int] | None = None
+	with open_llvm_file(file_name) as file:
+		for line_number, line in enumerate(file, 1):
+			if line.startswith("!"):
+				node = METADATA.match(line)
+				if node != None and node.group(2).startswith("DI"):
+					metadata[int(node.group(1))] = (node.group(2),
+													metadata_fields(node.group(3)))
+				continue
+			attachment = DBG_ATTACHMENT.search(line)
+			if is_define(line):
+				function = (extract_called_function(line),
+							int(attachment.group(1)) if attachment else -1,
+							line_number)
+			elif is_end_of_define(line) and function != None:
+				functions.append(function + (line_number,))
+				function = None
+			elif attachment != None and "@llvm.dbg." not in line:
+				# debug intrinsics are not targets
+				attachments.append((line_number, int(attachment.group(1))))
+
+	def source_file(scope_id: int) -> str | None:
+		# the file of a scope (subprogram, lexical block...) or of a location
+		seen = set()
+		while scope_id in metadata and scope_id not in seen:
+			seen.add(scope_id)
+			kind, fields = metadata[scope_id]
+			if kind == "DIFile":
+				name = fields.get("filename", "")
+				directory = fields.get("directory", "")
+				return name if os.path.isabs(name) or directory == "" else os.path.join(directory, name)
+			if "file" in fields:
+				scope_id = int(fields["file"][1:])
+			elif "scope" in fields:
+				scope_id = int(fields["scope"][1:])
+			else:
+				return None
+		return None
+
+	index: DebugIndex = DebugIndex()
+	for line_number, location_id in attachments:
+		kind, fields = metadata.get(location_id, ("", {}))
+		if kind != "DILocation" or "scope" not in fields:
+			continue
+		path = source_file(int(fields["scope"][1:]))
+		if path != None:
+			index.add_instruction(line_number, path, int(fields["line"]))
+	for name, subprogram_id, first_line, last_line in functions:
+		kind, fields = metadata.get(subprogram_id, ("", {}))
+		if kind == "DISubprogram" and "line" in fields:
+			path = source_file(subprogram_id)
+			if path != None:
+				index.add_function(name, path, int(fields["line"]), first_line,
+								   last_line)
+	return index
+
+def is_llvm_line(target: str) -> bool:
+	"""
+	Checks if a target is a line of the LLVM file
+	"""
+	return target.isdigit()
+
+def parse_target(target: str) -> Tuple[bool, str, int]:
+	"""
+	Splits a source target into (False, FILE, LINE) or (True, FUNCTION, 
+	OFFSET). Raises TargetError if the target is neither.
+	"""
+	source_location = re.fullmatch(r"(.+):(\d+)", target)
+	if source_location != None:
+		return False, source_location.group(1), int(source_location.group(2))
+	function_offset = re.fullmatch(r"(@?[-\w.$]+)\+(\d+)", target)
+	if function_offset != None:
+		return True, function_offset.group(1), int(function_offset.group(2))
+	raise TargetError(f"'{target}' is not a LINE, FILE:LINE or "
+					  f"FUNCTION+OFFSET target")
+
+def find_source_target(target: str, index: DebugIndex) -> List[int]:
+	"""
+	Returns the lines of the LLVM file of the instructions of a source target
+	(possibly none)
+	"""
+	is_function, place, number = parse_target(target)
+	if is_function:
+		return index.find_function_offset(place, number)
+	return index.find_source_line(place, number)
+
+def resolve_targets(
+		targets: List[str],
+		file_name: str,
+		index: DebugIndex = None
+	) -> Tuple[List[int], DebugIndex | None]:
+	"""
+	Converts targets into lines of the LLVM file (a source location can yield
+	several instructions: the distance is then the distance to the nearest
+	one). The debug index is built if needed and not given.
+	Returns the lines and the debug index (None if not needed).
+	Raises TargetError if a target cannot be resolved.
+	"""
+	lines: List[int] = []
+	for target in targets:
+		if is_llvm_line(target):
+			lines.append(int(target))
+			continue
+
+		parse_target(target) # checks the syntax before reading the file
+		if index == None:
+			if file_name == "-":
+				raise TargetError("source targets need a LLVM file, not the "
+								  "standard input")
+			index = build_debug_index(file_name)
+
+		found = find_source_target(target, index)
+		if found == []:
+			raise TargetError(f"no instruction with debug information for "
+							  f"'{target}'")
+		lines += found
+	return list(dict.fromkeys(lines)), index
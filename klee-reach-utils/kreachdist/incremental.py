@@ -0,0 +1,183 @@
+from kreachdist.compute_distance import build_dist_file, find_targets_by_lines
+from kreachdist.summary import summarize_functions
+from kreachdist.parse import parse_lines
+from kreachdist.datastructs.AnalysisCache import AnalysisCache
+from kreachdist.datastructs.CFG import CFG
+from kreachdist.datastructs.DistanceContainer import DistanceContainer
+from kreachdist.datastructs.Program import Program
+from kreachdist.utils.CallPaths import compute_g_call
+from kreachdist.utils.misc import open_llvm_file
+from kreachdist.utils.regex import is_define, is_end_of_define, extract_called_function, strip_metadata_refs
+
+import bisect
+import hashlib
+from typing import List, Mapping, Set, Tuple
+
+def split_functions(lines: List[str]) -> List[Tuple[str, int, int]]:
+	"""
+	Returns the (name, first index, last index) of each function defined in
+	the LLVM lines. The first index is the one of the define statement and the
+	last index is the one of the closing '}'.
+	"""
+	functions: List[Tuple[str, int, int]] = []
+	name: str = ""
+	start: int = -1
+	for i, line in enumerate(lines):
+		if is_define(line):
+			name, start = extract_called_function(line), i
+		elif is_end_of_define(line) and start != -1:
+			functions.append((name, start, i))
+			start = -1
+	return functions
+
+def hash_function(lines: List[str]) -> str:
+	"""
+	Hashes the body of a function. Metadata references are ignored: they shift
+	whenever another function changes, without any effect on the CFG.
+	"""
+	h = hashlib.sha1()
+	for line in lines:
+		h.update(strip_metadata_refs(line).encode())
+	return h.hexdigest()
+
+def parse_incremental(
+		file_name: str,
+		cache: AnalysisCache
+	) -> Tuple[Program, AnalysisCache, Set[str]]:
+	"""
+	Parses a LLVM file, reusing the CFG of every function whose body has not
+	changed since the analysis stored in `cache` (only its line numbers are
+	remapped).
+	Returns the program, a new cache describing the file and the names of the
+	functions that are new, modified or removed.
+	"""
+	with open_llvm_file(file_name) as file:
+		lines: List[str] = file.readlines()
+
+	program: Program = Program()
+	new_cache: AnalysisCache = AnalysisCache()
+	changed: Set[str] = set()
+
+	for name, start, end in split_functions(lines):
+		body: List[str] = lines[start:end + 1]
+		digest: str = hash_function(body)
+		start_line: int = start + 1 # line numbers start at 1
+
+		if cache.get_hash(name) == digest:
+			# same body: we only have to move the function in the file
+			cfg: CFG = cache.get_cfg(name)
+			cfg.shift_lines(start_line - cache.get_start_line(name))
+			cfg.set_id(len(program.get_cfgs()))
+			program.add_defined_function(name)
+			program.add_cfg(cfg)
+		else:
+			parsed: List[CFG] = list(parse_lines(program, body, start))
+			if parsed == []: # malformed function
+				continue
+			cfg = parsed[0]
+			changed.add(name)
+
+		new_cache.add_function(name, digest, start_line, cfg)
+
+	# removed functions
+	for name, _ in cache.get_layout():
+		if new_cache.get_hash(name) == None:
+			changed.add(name)
+
+	return program, new_cache, changed
+
+def invalidated_functions(cfgs: List[CFG], changed: Set[str]) -> Set[str]:
+	"""
+	Returns the functions whose summary has to be recomputed: the changed
+	functions and all the functions that (transitively) call them
+	"""
+	callers: Mapping[str, Set[str]] = {}
+	for (caller, _), (called, _) in compute_g_call(cfgs).items():
+		callers.setdefault(called, set()).add(caller)
+
+	invalidated: Set[str] = set(changed)
+	worklist: List[str] = list(changed)
+	while worklist:
+		name: str = worklist.pop()
+		for caller in callers.get(name, ()):
+			if caller not in invalidated:
+				invalidated.add(caller)
+				worklist.append(caller)
+	return invalidated
+
+def relative_distances(
+		dist: DistanceContainer,
+		cache: AnalysisCache
+	) -> List[Tuple[str, int, int]]:
+	"""
+	Converts the distances to (function name, line - start_line, distance)
+	"""
+	names: List[str] = [name for name, _ in cache.get_layout()]
+	starts: List[int] = [cache.get_start_line(name) for name in names]
+	distances: List[Tuple[str, int, int]] = []
+	for line, distance in dist.get_elements():
+		name: str = names[bisect.bisect_right(starts, line) - 1]
+		distances.append((name, line - cache.get_start_line(name), distance))
+	return distances
+
+def analyze_incremental(
+		file_name: str,
+		cache_file_name: str,
+		debug: bool,
+		target_lines: List[int] = None,
+		max_distance: int = None,
+		max_lines: int = None
+	) -> Tuple[Program, DistanceContainer | None]:
+	"""
+	Computes the distances of a LLVM file by only redoing the work invalidated
+	by the changes since the previous analysis (stored in cache_file_name).
+	The cache is updated with the new results.
+	Returns no distances if a target line does not contain an instruction.
+	"""
+	cache: AnalysisCache = AnalysisCache.load(cache_file_name)
+	program, new_cache, changed = parse_incremental(file_name, cache)
+
+	if debug:
+		print(f"Changed functions: {sorted(changed)}")
+
+	# summaries of functions that do not depend on a changed function are kept
+	invalidated: Set[str] = invalidated_functions(program.get_cfgs(), changed)
+	defined_functions: Mapping[str, bool] = program.get_defined_functions()
+	previous_summaries: Mapping[str, int] = {
+		name: summary for name, summary in cache.get_summaries().items()
+		if name in defined_functions and name not in invalidated
+	}
+	summaries: Mapping[str, int] = summarize_functions(program, debug,
+													   previous_summaries)
+	new_cache.set_summaries(summaries)
+
+	targets: List[Tuple[str, int, int]] | None = None
+	if target_lines != None:
+		found = find_targets_by_lines(program.get_cfgs(), target_lines)
+		for line in target_lines:
+			if line not in found:
+				print(f"ERROR: no instruction at line {line}")
+				return program, None
+		targets = [found[line] for line in target_lines]
+	new_cache.set_settings((targets, max_distance, max_lines))
+
+	dist: DistanceContainer = DistanceContainer()
+	if (cache.get_layout() != [] and new_cache.get_layout() == cache.get_layout()
+		and cache.get_settings() == new_cache.get_settings()):
+		# no function has changed: the shortest paths are the same, only their
+		# line numbers have moved
+		for name, offset, distance in cache.get_distances():
+			dist.add_element(new_cache.get_start_line(name) + offset, distance)
+		dist.set_cutoff(cache.get_cutoff())
+		new_cache.set_distances(cache.get_distances())
+	else:
+		# a changed function can be on the shortest path of any instruction
+		dist = build_dist_file(program.get_cfgs(), summaries, debug,
+							   targets=targets, max_distance=max_distance,
+							   max_lines=max_lines)
+		new_cache.set_distances(relative_distances(dist, new_cache))
+	new_cache.set_cutoff(dist.get_cutoff())
+
+	new_cache.save(cache_file_name)
+
+	return program, dist
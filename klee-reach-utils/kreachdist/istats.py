@@ -0,0 +1,95 @@
+from kreachdist.datastructs.CFG import CFG
+from kreachdist.utils.regex import is_label_definition, is_define
+
+from typing import Iterator, List, Mapping, Tuple
+
+# Events of run.istats used to weight basic blocks: number of executions and
+# solver time (in microseconds)
+INSTRUCTIONS_EVENT = "I"
+QUERY_TIME_EVENT = "Qtime"
+
+def iter_istats(file_name: str) -> Iterator[Tuple[int, int, int]]:
+	"""
+	Reads a run.istats file line by line and yields, for each instruction
+	record, its line in assembly.ll, its number of executions and its solver
+	time. The inclusive records of call sites (after 'calls=') are skipped.
+	"""
+	with open(file_name, "r") as f:
+		events: List[str] | None = None
+		for line in f: # header (up to 'ob=')
+			if line.startswith("ob="):
+				break
+			if line.startswith("positions:") and line.split()[1:] != ["instr", "line"]:
+				raise ValueError(f"{file_name}: unexpected 'positions' directive")
+			if line.startswith("events:"):
+				events = line[len("events:"):].split()
+		if events == None:
+			raise ValueError(f"{file_name}: missing 'events' directive")
+		if INSTRUCTIONS_EVENT not in events or QUERY_TIME_EVENT not in events:
+			raise ValueError(f"{file_name}: missing '{INSTRUCTIONS_EVENT}' or "
+							 f"'{QUERY_TIME_EVENT}' event")
+		# the first two columns are the positions
+		instructions_column: int = events.index(INSTRUCTIONS_EVENT) + 2
+		query_time_column: int = events.index(QUERY_TIME_EVENT) + 2
+
+		call_site: bool = False
+		for line in f:
+			if not line[:1].isdigit():
+				# 'fl=', 'fn=', 'cfl=', 'cfn=' or 'calls=' (the next record
+				# sums up the calls: it is not an instruction record)
+				call_site = line.startswith("calls=")
+				continue
+			if call_site:
+				call_site = False
+				continue
+			fields: List[str] = line.split()
+			yield (int(fields[0]), int(fields[instructions_column]),
+				   int(fields[query_time_column]))
+
+def read_istats(file_names: List[str]) -> Mapping[int, Tuple[int, int]]:
+	"""
+	Sums the (executions, solver time) of each line of assembly.ll over
+	several run.istats files (e.g. several runs of KLEE on the same file)
+	"""
+	stats: Mapping[int, Tuple[int, int]] = {}
+	for file_name in file_names:
+		for line, executions, query_time in iter_istats(file_name):
+			previous = stats.get(line)
+			if previous != None:
+				executions += previous[0]
+				query_time += previous[1]
+			stats[line] = (executions, query_time)
+	return stats
+
+def apply_istats_weights(
+		cfgs: List[CFG],
+		stats: Mapping[int, Tuple[int, int]],
+		solver_cost_unit: int
+	) -> int:
+	"""
+	Adds to the weight of each basic block executed by KLEE the average solver
+	time of an execution of the basic block, counting `solver_cost_unit`
+	microseconds as one instruction. The summaries computed afterwards take
+	these weights into account too.
+	Returns the number of basic blocks whose weight has changed.
+	"""
+	weighted: int = 0
+	for cfg in cfgs:
+		for bb in cfg.get_basic_blocks():
+			executions: int = 0
+			query_time: int = 0
+			for llvm_instr in bb.get_llvm_instructions():
+				if (is_label_definition(llvm_instr.get_instr())
+					or is_define(llvm_instr.get_instr())):
+					continue
+				line_stats = stats.get(llvm_instr.get_line())
+				if line_stats != None:
+					executions = max(executions, line_stats[0])
+					query_time += line_stats[1]
+			if executions == 0: # never executed: nothing observed
+				continue
+			extra_weight: int = round(query_time / executions / solver_cost_unit)
+			bb.set_extra_weight(extra_weight)
+			if extra_weight != 0:
+				weighted += 1
+	return weighted
@@ -0,0 +1,173 @@
+from kreachdist.compute_distance import explore_backward, add_bb_distances, default_targets, target_lines, target_distance, executed_lines, reachable_blocks, limit_distances
+from kreachdist.datastructs.CFG import CFG
+from kreachdist.datastructs.DistanceContainer import DistanceContainer
+from kreachdist.datastructs.Landmarks import Landmarks
+from kreachdist.datastructs.Supergraph import Supergraph
+from kreachdist.utils.misc import get_cfg_by_name, get_file_stamp, llvm_file_prefix
+
+import math
+from typing import List, Mapping, Set, Tuple
+
+def block_distances(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		target: Tuple[str, int]
+	) -> Mapping[Tuple[str, int], int]:
+	"""
+	Returns the distance from every basic block to the target basic block
+	(unreachable basic blocks are missing)
+	"""
+	distances: Mapping[Tuple[str, int], int] = {}
+	for bb_dist, cfg, bb, _ in explore_backward(cfgs, summaries, supergraph,
+											 [target], False):
+		distances.setdefault((cfg.get_name(), bb.get_id()), bb_dist)
+	return distances
+
+def first_landmark(cfgs: List[CFG]) -> Tuple[str, int]:
+	"""
+	Returns the first landmark: the last basic block of main (most of the
+	program reaches it), or of the first function if main is not defined
+	"""
+	cfg: CFG | None = get_cfg_by_name(cfgs, "@main")
+	if cfg == None or cfg.size() == 0:
+		cfg = cfgs[0]
+	return cfg.get_name(), cfg.size() - 1
+
+def compute_landmarks(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		count: int,
+		stamp: Tuple[int, int]
+	) -> Landmarks:
+	"""
+	Selects `count` landmarks and computes the distances of all basic blocks to
+	them. After the first one, each landmark is the basic block which is the 
+	farthest from the landmarks already selected (farthest landmark selection).
+	"""
+	landmarks: Landmarks = Landmarks(stamp)
+	blocks: List[Tuple[str, int]] = [(cfg.get_name(), bb.get_id())
+									 for cfg in cfgs
+									 for bb in cfg.get_basic_blocks()]
+	if blocks == []:
+		return landmarks
+
+	# distance of each basic block to its nearest landmark
+	nearest: Mapping[Tuple[str, int], float] = {b: math.inf for b in blocks}
+	landmark: Tuple[str, int] = first_landmark(cfgs)
+
+	while landmarks.size() < min(count, len(blocks)):
+		distances = block_distances(cfgs, summaries, supergraph, landmark)
+		landmarks.add_landmark(landmark, distances)
+
+		for b in blocks:
+			nearest[b] = min(nearest[b], distances.get(b, math.inf))
+		nearest[landmark] = -1 # never selected twice
+		landmark = max(blocks, key=lambda b: nearest[b])
+
+	return landmarks
+
+def lower_bound(
+		landmarks: Landmarks,
+		block: Tuple[str, int],
+		target: Tuple[str, int],
+		target_size: int
+	) -> float:
+	"""
+	Returns the estimate of the distance from block to target given by the 
+	landmarks: the greatest difference between the distances of the block 
+	and of the target to a landmark (0 if no landmark gives one). This is not
+	a strict lower bound: the return edges after which no call edge can be 
+	taken break the triangle inequality.
+	"""
+	bound: float = 0
+	for distances in landmarks.get_distances():
+		target_dist = distances.get(target)
+		block_dist = distances.get(block)
+		if target_dist == None or block_dist == None:
+			continue # the landmark says nothing about the block or the target
+		bound = max(bound, block_dist - target_dist + target_size)
+	return bound
+
+def approximate_dist_file(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		landmarks: Landmarks,
+		radius: int,
+		debug: bool,
+		targets: List[Tuple] = None,
+		max_distance: int = None,
+		max_lines: int = None
+	) -> DistanceContainer:
+	"""
+	Computes approximate distances between LLVM instructions and the target: 
+	distances up to `radius` are exact (Dijkstra's algorithm stops once no 
+	instruction of the remaining basic blocks can be that near), the others 
+	are estimated from the landmarks (always greater than `radius`). Basic 
+	blocks which do not reach the targets get no distance.
+	max_distance and max_lines cut the approximate distances as the exact ones
+	(see `build_dist_file`).
+	"""
+	dist: DistanceContainer = DistanceContainer()
+
+	if targets == None:
+		targets = default_targets(cfgs)
+
+	if targets == []: # no target found (i.e. no 'klee-reach' instruction)
+		print("WARNING: no target found")
+		return dist
+
+	# the instructions of a basic block at distance bb_dist are at least at 
+	# bb_dist - longest
+	longest: int = max(executed_lines(bb) for cfg in cfgs
+					   for bb in cfg.get_basic_blocks())
+
+	# exact distances around the targets
+	lines: Mapping[Tuple[str, int], Set[int]] = target_lines(cfgs, targets)
+	settled = set()
+	for bb_dist, cfg, bb, _ in explore_backward(cfgs, summaries, supergraph,
+											 targets, debug):
+		if bb_dist - longest > radius:
+			break
+		add_bb_distances(dist, bb, bb_dist, lines.get((cfg.get_name(), bb.get_id())))
+		settled.add((cfg.get_name(), bb.get_id()))
+
+	# estimated distances for the other basic blocks which reach the targets
+	target_sizes: List[int] = [target_distance(get_cfg_by_name(cfgs, name).get_basic_block(bb_id),
+											   block_lines)
+							   for (name, bb_id), block_lines in lines.items()]
+	for cfg_name, bb_id in reachable_blocks(cfgs, summaries, supergraph, targets):
+		block = (cfg_name, bb_id)
+		if block in settled:
+			continue
+		bb = get_cfg_by_name(cfgs, cfg_name).get_basic_block(bb_id)
+		estimate = min(lower_bound(landmarks, block, target, size)
+					   for target, size in zip(lines, target_sizes))
+		# not settled: all its instructions are farther than the radius
+		add_bb_distances(dist, bb, max(estimate, radius + 1 + executed_lines(bb)),
+						 lines.get(block))
+
+	return limit_distances(dist, max_distance, max_lines)
+
+def get_landmarks(
+		file_name: str,
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		count: int
+	) -> Landmarks:
+	"""
+	Returns the landmarks of a LLVM file: they are read from FILE.klm if they
+	were computed for the current version of the file, otherwise they are 
+	computed and saved in FILE.klm
+	"""
+	landmarks_file_name: str = llvm_file_prefix(file_name) + ".klm"
+	stamp: Tuple[int, int] = get_file_stamp(file_name)
+	landmarks: Landmarks | None = Landmarks.load(landmarks_file_name)
+	if (landmarks == None or landmarks.get_stamp() != stamp
+		or landmarks.size() != count):
+		landmarks = compute_landmarks(cfgs, summaries, supergraph, count, stamp)
+		landmarks.save(landmarks_file_name)
+	return landmarks
@@ -0,0 +1,151 @@
+from kreachdist.debuginfo import build_debug_index, is_llvm_line, parse_target, find_source_target, TargetError
+from kreachdist.parse import parse
+from kreachdist.datastructs.DistanceContainer import DistanceContainer
+from kreachdist.datastructs.ParsedModule import ParsedModule
+from kreachdist.datastructs.Program import Program
+from kreachdist.utils.misc import get_file_stamp, llvm_file_prefix
+
+import bisect
+import concurrent.futures
+import os
+from typing import List, Tuple
+
+# Linking several LLVM modules (e.g. a program and the libraries it is linked
+# with, disassembled separately): the modules are parsed in parallel, then
+# their CFGs are gathered in one program, where calls are resolved by function
+# name like in the other analyses. Calls and returns between functions of
+# different modules thus get their edges, and calls to functions of other
+# modules get their summaries.
+#
+# The lines of each module are numbered after the lines of the previous
+# modules (as if the files were concatenated): the line L of the module i is
+# the line bases[i] + L of the linked program. The .dist file is split back
+# into one section per module, introduced by a '#module:FILE' header line,
+# with the lines of that module.
+#
+# The program parsed from each module is kept in MODULE.kparse: an unchanged
+# module is never parsed again.
+
+def last_line(program: Program) -> int:
+	"""
+	Returns the line of the last instruction of a program
+	"""
+	last: int = 0
+	for cfg in program.get_cfgs():
+		for bb in cfg.get_basic_blocks():
+			instructions = bb.get_llvm_instructions()
+			if instructions != []:
+				last = max(last, instructions[-1].get_line())
+	return last
+
+def load_module(file_name: str) -> ParsedModule:
+	"""
+	Returns the parsed program of a LLVM module: it is read from
+	MODULE.kparse if it was parsed from the current version of the file,
+	otherwise the file is parsed and the result saved in MODULE.kparse
+	"""
+	cache_file_name: str = llvm_file_prefix(file_name) + ".kparse"
+	stamp: Tuple[int, int] = get_file_stamp(file_name)
+	module: ParsedModule | None = ParsedModule.load(cache_file_name)
+	if module == None or module.get_stamp() != stamp:
+		program: Program = parse(file_name)
+		module = ParsedModule(stamp, program, last_line(program))
+		try:
+			module.save(cache_file_name)
+		except OSError: # read-only directory: the module is parsed each time
+			pass
+	return module
+
+def parse_modules(file_names: List[str]) -> List[ParsedModule]:
+	"""
+	Parses LLVM modules in parallel (one process per module, at most one per
+	CPU), in the order of `file_names`
+	"""
+	if len(file_names) == 1:
+		return [load_module(file_names[0])]
+	workers: int = min(len(file_names), os.cpu_count() or 1)
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+		return list(pool.map(load_module, file_names))
+
+def link_modules(
+		modules: List[ParsedModule],
+		file_names: List[str]
+	) -> Tuple[Program, List[int]]:
+	"""
+	Gathers the CFGs of the modules in one program, resolving calls by
+	function name. When a function is defined in several modules, the first
+	definition is kept (like a linker with the modules in this order).
+	Returns the program and the line of the linked program preceding the
+	first line of each module.
+	"""
+	program: Program = Program()
+	bases: List[int] = []
+	base: int = 0
+	for module, file_name in zip(modules, file_names):
+		bases.append(base)
+		for cfg in module.get_program().get_cfgs():
+			name: str = cfg.get_name()
+			if name in program.get_defined_functions():
+				print(f"WARNING: {name} of {file_name} is already defined, "
+					  "ignored")
+				continue
+			cfg.shift_lines(base)
+			cfg.set_id(len(program.get_cfgs()))
+			program.add_defined_function(name)
+			program.add_cfg(cfg)
+		base += module.get_last_line()
+	return program, bases
+
+def resolve_linked_targets(
+		targets: List[str],
+		file_names: List[str],
+		bases: List[int]
+	) -> List[int]:
+	"""
+	Converts targets into lines of the linked program: a LINE is a line of
+	the first module, while source targets are looked for in the debug
+	information of every module.
+	Raises TargetError if a target cannot be resolved.
+	"""
+	lines: List[int] = []
+	indexes = [None] * len(file_names) # built when needed
+	for target in targets:
+		if is_llvm_line(target):
+			lines.append(int(target))
+			continue
+
+		parse_target(target) # checks the syntax before reading the files
+		found: List[int] = []
+		for i, file_name in enumerate(file_names):
+			if indexes[i] == None:
+				indexes[i] = build_debug_index(file_name)
+			found += [bases[i] + line
+					  for line in find_source_target(target, indexes[i])]
+		if found == []:
+			raise TargetError(f"no instruction with debug information for "
+							  f"'{target}'")
+		lines += found
+	return list(dict.fromkeys(lines))
+
+def write_linked_dist(
+		dist: DistanceContainer,
+		file_names: List[str],
+		bases: List[int],
+		file_name: str
+	) -> None:
+	"""
+	Outputs the distances of a linked program in a .dist file, with one
+	section per module: a '#module:FILE' line followed by the distances of
+	the module (with its own line numbers)
+	"""
+	sections: List[List[Tuple[int, int]]] = [[] for _ in file_names]
+	for line, distance in dist.get_elements():
+		i: int = bisect.bisect_left(bases, line) - 1
+		sections[i].append((line - bases[i], distance))
+
+	with open(file_name + ".dist", "w") as f:
+		f.write(dist.header())
+		for module_name, section in zip(file_names, sections):
+			f.write(f"#module:{module_name}\n")
+			f.write("".join(f"{line}:{distance}\n" for line, distance in section))
+	return None
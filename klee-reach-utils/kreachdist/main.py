@@ -1,49 +1,322 @@
-from kreachdist.compute_distance import build_dist_file
+from kreachdist.compute_distance import build_dist_file, find_targets_by_lines
+from kreachdist.debuginfo import resolve_targets, TargetError
+from kreachdist.link import parse_modules, link_modules, resolve_linked_targets, write_linked_dist
 from kreachdist.summary import summarize_functions
-from kreachdist.parse import parse, display_result
+from kreachdist.incremental import analyze_incremental
+from kreachdist.istats import read_istats, apply_istats_weights
+from kreachdist.prune import prune_distances, write_delta
+from kreachdist.landmarks import get_landmarks, approximate_dist_file
+from kreachdist.utils.CallPaths import build_supergraph
+from kreachdist.server import serve, request_distances
+from kreachdist.pipeline import parse_and_summarize
+from kreachdist.datastructs.NextHopContainer import NextHopContainer
+from kreachdist.parse import display_result
+from kreachdist.utils.misc import llvm_file_prefix
 
-import sys
+import argparse
+import os
+
+def parse_arguments() -> argparse.Namespace:
+	"""
+	Parses the command line arguments
+	"""
+	parser = argparse.ArgumentParser(
+		description="Computes the .dist file of a LLVM file (distances to the "
+					"klee_reach() target)")
+	parser.add_argument("file", nargs="?",
+						help="LLVM file (.ll, or .ll.gz, .ll.xz, .ll.bz2; '-' "
+							 "for the standard input)")
+	parser.add_argument("debug", nargs="?", choices=["debug"],
+						help="display debugging information")
+	parser.add_argument("--output", metavar="DIST",
+						help="path of the .dist file (default: FILE with the "
+							 ".dist extension; required when FILE is '-')")
+	parser.add_argument("--incremental", action="store_true",
+						help="reuse the results of the previous analysis of the "
+							 "file for the functions that have not changed "
+							 "(stored in FILE.kcache)")
+	parser.add_argument("--link", action="append", metavar="MODULE",
+						help="LLVM file of another module linked with FILE "
+							 "(can be repeated): the modules are analyzed "
+							 "together, and the .dist file has one section "
+							 "per module")
+	parser.add_argument("--target", action="append", metavar="TARGET",
+						help="target instruction: LINE of the LLVM file, "
+							 "FILE:LINE of a source file or FUNCTION+OFFSET "
+							 "(source line OFFSET lines after the definition "
+							 "of FUNCTION), the last two through the debug "
+							 "information of the LLVM file (can be repeated; "
+							 "default: first call to klee_reach())")
+	parser.add_argument("--max-distance", type=int, metavar="D",
+						help="stop the computation at distance D (farther "
+							 "instructions get no distance)")
+	parser.add_argument("--max-lines", type=int, metavar="N",
+						help="stop the computation before writing more than N "
+							 "distances")
+	parser.add_argument("--next-hop", action="store_true",
+						help="also write the shortest-path tree in FILE.next "
+							 "(next basic block of each instruction on its "
+							 "shortest path)")
+	parser.add_argument("--istats", action="append", metavar="RUN_ISTATS",
+						help="run.istats of a previous KLEE run on this file "
+							 "(can be repeated): the solver time observed in "
+							 "each basic block is added to its weight")
+	parser.add_argument("--solver-cost-unit", type=int, default=100,
+						metavar="US",
+						help="solver time (in microseconds) counted as one "
+							 "instruction with --istats (default: 100)")
+	parser.add_argument("--approximate", type=int, metavar="RADIUS",
+						help="only compute exact distances up to RADIUS, and "
+							 "estimate the others with landmarks (stored in "
+							 "FILE.klm)")
+	parser.add_argument("--landmarks", type=int, default=8, metavar="K",
+						help="number of landmarks for --approximate "
+							 "(default: 8)")
+	parser.add_argument("--prune", metavar="REMOVALS",
+						help="prune the basic blocks and edges listed in "
+							 "REMOVALS (found infeasible by KLEE) and update "
+							 "the distances of the previous rounds (kept in "
+							 "FILE.kspt); the changes are written in FILE.ddist")
+	parser.add_argument("--serve", metavar="SOCKET",
+						help="run a distance server listening on the Unix "
+							 "socket SOCKET (no FILE needed)")
+	parser.add_argument("--max-modules", type=int, default=8, metavar="N",
+						help="number of analyzed files kept in memory by the "
+							 "distance server (default: 8)")
+	parser.add_argument("--server", metavar="SOCKET",
+						help="ask the distance server listening on SOCKET to "
+							 "compute the .dist file")
+	args = parser.parse_intermixed_args()
+	if args.file == None and args.serve == None:
+		parser.error("the LLVM file is required")
+	if args.file == "-" and args.output == None:
+		parser.error("--output is required when the LLVM file is read from "
+					 "the standard input")
+	if args.output != None and not args.output.endswith(".dist"):
+		parser.error("the output must be a .dist file")
+	return args
 
 def compute_distance():
 	"""
 	Executes the distance computation and outputs the result in a .dist file
 	"""
+	args = parse_arguments()
+	debug = args.debug == "debug"
+
+	file_name_path = args.file
+
+	if args.serve != None and args.incremental:
+		print("ERROR: --incremental cannot be used with --serve (the server "
+			  "keeps its analyses in memory)")
+		return None
 
-	#########################
-	# PARSING THE LLVM FILE #
-	#########################
-	if len(sys.argv) < 2:
-		print(f"ERROR: LLVM file missing")
+	if args.serve != None:
+		#######################
+		# RUNNING THE SERVER  #
+		#######################
+		serve(args.serve, args.max_modules)
 		return None
-	debug = (len(sys.argv) > 2) and (sys.argv[2] == "debug")
 
-	file_name_path = sys.argv[1]
+	# the files written next to the .dist file are named after it
+	if args.output != None:
+		output_prefix = args.output[:-5]
+	else:
+		output_prefix = llvm_file_prefix(file_name_path)
 
-	program = parse(file_name_path)
+	if file_name_path == "-" and (args.approximate != None or args.incremental
+								  or args.server != None or args.prune != None):
+		print("ERROR: --approximate, --incremental, --server and --prune need a "
+			  "LLVM file, not the standard input")
+		return None
 
-	if debug:
-		display_result(program.get_cfgs())
+	if args.landmarks < 1:
+		print("ERROR: at least one landmark is needed")
+		return None
+
+	if args.approximate != None and args.approximate < 0:
+		print("ERROR: the radius of --approximate cannot be negative")
+		return None
 
-	#######################
-	# COMPUTING SUMMARIES #
-	#######################
-	summaries = summarize_functions(program, debug)
+	if args.next_hop and (args.approximate != None or args.incremental or
+						  args.server != None):
+		print("ERROR: --next-hop needs exact distances computed in this process")
+		return None
+
+	if args.istats != None and (args.approximate != None or args.incremental
+								or args.server != None):
+		print("ERROR: --istats needs exact distances computed in this process")
+		return None
+
+	if args.solver_cost_unit < 1:
+		print("ERROR: the solver cost unit must be positive")
+		return None
+
+	if args.prune != None and (args.approximate != None or args.incremental
+							   or args.server != None or args.istats != None
+							   or args.next_hop or args.max_distance != None
+							   or args.max_lines != None):
+		print("ERROR: --prune cannot be combined with other distance options "
+			  "than --target")
+		return None
+
+	if args.link != None and (file_name_path == "-" or args.approximate != None
+							  or args.incremental or args.server != None
+							  or args.prune != None or args.next_hop
+							  or args.istats != None):
+		print("ERROR: --link cannot be combined with the standard input, "
+			  "--approximate, --incremental, --server, --prune, --next-hop "
+			  "and --istats")
+		return None
 
-	if debug:
-		print(summaries)
-	
-	#######################
-	# COMPUTING DISTANCES #
-	#######################
-	dist = build_dist_file(program.get_cfgs(), summaries, debug)
+	if args.link != None:
+		###################################################
+		# PARSING THE MODULES (IN PARALLEL) & LINKING THEM #
+		###################################################
+		file_names = [file_name_path] + args.link
+		program, bases = link_modules(parse_modules(file_names), file_names)
+		summaries = summarize_functions(program, debug)
+
+		if debug:
+			display_result(program.get_cfgs())
+			print(summaries)
+
+		targets = None
+		if args.target != None:
+			try:
+				lines = resolve_linked_targets(args.target, file_names, bases)
+			except TargetError as e:
+				print(f"ERROR: {e}")
+				return None
+			found = find_targets_by_lines(program.get_cfgs(), lines)
+			for line in lines:
+				if line not in found:
+					print(f"ERROR: no instruction at line {line}")
+					return None
+			targets = [found[line] for line in lines]
+
+		dist = build_dist_file(program.get_cfgs(), summaries, debug,
+							   targets=targets,
+							   max_distance=args.max_distance,
+							   max_lines=args.max_lines)
+		write_linked_dist(dist, file_names, bases, output_prefix)
+		print(f"Distances wrote in {output_prefix}.dist")
+		return None
+
+	if args.target != None:
+		# source targets are converted into lines of the LLVM file (the debug
+		# information is only read if needed)
+		try:
+			args.target, _ = resolve_targets(args.target, file_name_path)
+		except TargetError as e:
+			print(f"ERROR: {e}")
+			return None
+
+	if args.prune != None:
+		###################################
+		# PRUNING INFEASIBLE BASIC BLOCKS #
+		###################################
+		result = prune_distances(file_name_path, output_prefix + ".kspt",
+								 args.prune, debug, args.target)
+		if result == None:
+			return None
+		dist, changes = result
+		dist.write_in_file(output_prefix)
+		write_delta(changes, output_prefix)
+		print(f"Distances wrote in {output_prefix}.dist "
+			  f"({len(changes)} changes wrote in {output_prefix}.ddist)")
+		return None
+
+	if args.server != None:
+		##################################
+		# DELEGATING TO A RUNNING SERVER #
+		##################################
+		output = os.path.abspath(output_prefix + ".dist")
+		response = request_distances(args.server,
+									 {"module": os.path.abspath(file_name_path),
+									  "targets": args.target,
+									  "radius": args.approximate,
+									  "landmarks": args.landmarks,
+									  "max_distance": args.max_distance,
+									  "max_lines": args.max_lines,
+									  "output": output})
+		if response["status"] != "ok":
+			print(f"ERROR: {response['message']}")
+			return None
+		print(f"Distances wrote in {output[:-5]}.dist")
+		return None
+
+	if args.incremental:
+		###########################################
+		# REUSING THE PREVIOUS ANALYSIS (IF ANY)  #
+		###########################################
+		program, dist = analyze_incremental(file_name_path,
+											output_prefix + ".kcache",
+											debug, args.target,
+											args.max_distance, args.max_lines)
+		if dist == None:
+			return None
+
+	else:
+		stats = None
+		if args.istats != None:
+			try:
+				stats = read_istats(args.istats)
+			except (OSError, ValueError) as e:
+				print(f"ERROR: cannot read run.istats: {e}")
+				return None
+
+		def prepare(cfg):
+			# weights are needed before the summaries
+			apply_istats_weights([cfg], stats, args.solver_cost_unit)
+
+		###########################################################
+		# PARSING THE LLVM FILE & COMPUTING SUMMARIES (PIPELINED) #
+		###########################################################
+		program, summaries = parse_and_summarize(
+			file_name_path, debug, prepare if stats != None else None)
+
+		if debug:
+			display_result(program.get_cfgs())
+			print(summaries)
+
+		#######################
+		# COMPUTING DISTANCES #
+		#######################
+		targets = None
+		if args.target != None:
+			found = find_targets_by_lines(program.get_cfgs(), args.target)
+			for line in args.target:
+				if line not in found:
+					print(f"ERROR: no instruction at line {line}")
+					return None
+			targets = [found[line] for line in args.target]
+
+		if args.approximate != None:
+			supergraph = build_supergraph(program.get_cfgs())
+			landmarks = get_landmarks(file_name_path, program.get_cfgs(),
+									  summaries, supergraph, args.landmarks)
+			dist = approximate_dist_file(program.get_cfgs(), summaries,
+										 supergraph, landmarks,
+										 args.approximate, debug, targets,
+										 args.max_distance, args.max_lines)
+		else:
+			next_hops = NextHopContainer() if args.next_hop else None
+			dist = build_dist_file(program.get_cfgs(), summaries, debug,
+								   targets=targets,
+								   max_distance=args.max_distance,
+								   max_lines=args.max_lines,
+								   next_hops=next_hops)
 
 	################################
 	# WRITTING DISTANCES IN A FILE #
 	################################
-	file_name_path = file_name_path[:-3]
-	dist.write_in_file(file_name_path)
-	
-	print(f"Distances wrote in {file_name_path}.dist")
+	dist.write_in_file(output_prefix)
+
+	print(f"Distances wrote in {output_prefix}.dist")
+
+	if args.next_hop:
+		next_hops.write_in_file(output_prefix)
+		print(f"Next hops wrote in {output_prefix}.next")
 
 	return None
 
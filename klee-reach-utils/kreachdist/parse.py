@@ -2,11 +2,11 @@ from kreachdist.datastructs.BasicBlock import BasicBlock
 from kreachdist.datastructs.CFG import CFG
 from kreachdist.datastructs.Program import Program
 from kreachdist.datastructs.LLVMInstr import LLVMInstr
-from kreachdist.utils.regex import is_end_of_define, is_define, extract_called_function, is_switch, is_switch_end, is_label_definition, extract_label_from_def, search_label_in_cond_br, is_uncond_br, extract_label, is_call, is_br, has_label
-from kreachdist.utils.misc import new_id, is_ret, get_last_instr, reset_last_bb_succ, is_end_of_bb
+from kreachdist.utils.regex import is_end_of_define, is_define, is_declare, extract_called_function, is_switch, is_switch_end, is_label_definition, extract_label_from_def, search_label_in_cond_br, is_uncond_br, extract_label, is_call, is_br, has_label
+from kreachdist.utils.misc import open_llvm_file, new_id, is_ret, reset_last_bb_succ, is_end_of_bb
 
 import re
-from typing import List, Tuple, Match, Union
+from typing import Iterable, Iterator, List, Tuple, Match, Union
 
 ###
 ### TODO - generalize br/switch statements
@@ -18,12 +18,43 @@ def parse(file_name: str) -> Program:
 	the LLVM file
 	"""
 	program: Program = Program()
-	file = open(file_name, "r")
-	lines: List[str] = file.readlines()
-	line_number: int = 0
-	cfg: CFG = CFG("", -1)
+	for _ in iter_cfgs(file_name, program):
+		pass
+
+	return program
+
+def iter_cfgs(file_name: str, program: Program = None) -> Iterator[CFG]:
+	"""
+	Parses a LLVM file and yields each CFG, with all its successors and 
+	predecessors, as soon as the closing '}' of its function is parsed. The
+	CFGs are added to `program` too (if given).
+	"""
+	if program == None:
+		program = Program()
+	# the lines are streamed: the file ('-' for the standard input) may be 
+	# compressed, see `open_llvm_file`
+	with open_llvm_file(file_name) as file:
+		yield from parse_lines(program, file, 0)
+
+def parse_lines(
+		program: Program,
+		lines: Iterable[str],
+		first_line_number: int
+	) -> Iterator[CFG]:
+	"""
+	Breaks LLVM lines into basic blocks grouped into CFGs and adds these CFGs to
+	the program. `first_line_number` is the number of the line preceding
+	`lines` in the LLVM file.
+	Yields each CFG added, once its closing '}' has been parsed
+	"""
+	line_number: int = first_line_number
+	cfg: CFG = CFG("", len(program.get_cfgs()) - 1)
 	bb: BasicBlock = BasicBlock(new_id(-1))
 	wait_for_switch_end: bool = False # switch management
+	switch_labels: List[str] = [] # labels of the current switch statement
+	# jumps to labels not defined yet in the current function: 
+	# (basic block id, label), resolved at the end of the function
+	fixups: List[Tuple[int, str]] = []
 
 	# we iterate over each line...
 	for line in lines:
@@ -45,6 +76,30 @@ def parse(file_name: str) -> Program:
 				program.add_cfg(cfg) # note: next CFG will be setup when define
 									 #       statement reached
 
+				# all labels of the function are known: we can resolve the
+				# jumps to labels that were not defined yet when the jump was
+				# parsed
+				for bb_id, label in fixups:
+					target_id: int | None = cfg.get_id_by_label(label)
+					if target_id != None:
+						add_jump(cfg, cfg.get_basic_block(bb_id), target_id)
+				fixups = []
+				yield cfg
+
+			elif wait_for_switch_end:
+				# a case of the current switch statement (large switches have
+				# thousands of them): it can only jump to a label or end the 
+				# switch
+				bb.add_llvm_instr(LLVMInstr(line_number, line))
+				label_match = has_label(line)
+				if label_match:
+					switch_labels.append(extract_label(label_match.group()))
+				if is_switch_end(line):
+					wait_for_switch_end = False
+					cfg, bb = next_basic_block(cfg, bb, False)
+					add_jumps(cfg, cfg.get_basic_block(-1), switch_labels,
+							  fixups)
+
 			else:
 
 				# is the LLVM line a label definition?
@@ -68,6 +123,12 @@ def parse(file_name: str) -> Program:
 					bb = BasicBlock(new_id(-1)) # defining the new BB
 					bb.new_ignored_instruction() # define is not an instruction
 
+				# is the LLVM line a declare statement? (the function is 
+				# defined elsewhere: it has no CFG)
+				elif is_declare(line):
+					program.add_declared_function(
+						extract_called_function(line))
+
 				# note: even if the line is a label definition or a define
 				#       statement, we add it to the BB for debugging purpose
 				# 		we only need the number of 'non-instruction': BB's 
@@ -86,19 +147,27 @@ def parse(file_name: str) -> Program:
 				if is_switch(line):
 					wait_for_switch_end = True # we need to collect all labels
 											   # before ending the BB
+					# the default label (the cases follow)
+					label_match = has_label(line)
+					switch_labels = ([extract_label(label_match.group())]
+									 if label_match else [])
 
 				# we continue with the current BB until we meet the end of the
 				# switch statement
 				if wait_for_switch_end and is_switch_end(line):
 					wait_for_switch_end = False
-					# we can't add successors and predecessors until we resolved
-					# all labels: thus, we set `add_pred` to False	
+					# the successors are the labelled BBs, not the next BB: 
+					# thus, we set `add_pred` to False
 					cfg, bb = next_basic_block(cfg, bb, False)
+					add_jumps(cfg, cfg.get_basic_block(-1), switch_labels,
+							  fixups)
 
 				elif is_br(line):
-					# we can't add successors and predecessors until we resolved
-					# all labels: thus, we set `add_pred` to False
+					# the successors are the labelled BBs, not the next BB: 
+					# thus, we set `add_pred` to False
 					cfg, bb = next_basic_block(cfg, bb, False)
+					add_jumps(cfg, cfg.get_basic_block(-1), br_labels(line),
+							  fixups)
 
 				# `is_end_of_bb` checks whether the instruction is a terminator
 				# instruction
@@ -124,14 +193,6 @@ def parse(file_name: str) -> Program:
 					# all labels: thus, we set `add_pred` to False
 					cfg, bb = next_basic_block(cfg, bb, False)
 
-	file.close()
-
-	# we need another pass to assign successors and predecessors for br/switch
-	# (we call them 'indirect' successors/predecessors)
-	add_indirect_succ_pred(program.get_cfgs())
-
-	return program
-
 def next_basic_block(
 		control_flow_graph: CFG,
 		basic_block: BasicBlock,
@@ -158,63 +219,46 @@ def next_basic_block(
 ### -> indirectbr, invoke, callbr, catchswitch, catchret, cleanupret
 ###
 
-def add_indirect_succ_pred(cfgs: List[CFG]) -> None:
+def br_labels(instr: str) -> List[str]:
 	"""
-	Browses all CFGs looking up for jumps (br, switch, ... statements) and adds
-	indirect successor and predecessor for BBs in a CFG when found
+	Returns the labels a br instruction can jump to
 	"""
-	for cfg in cfgs:
-
-		# if a CFG contains at least a BB with a label...
-		if (len(cfg.labels) > 0):
-
-			for bb in cfg.get_basic_blocks():
-				last_instr: str = get_last_instr(bb) # only the last instruction
-													 # can contain a jump
-													 # instruction
-
-				# is the last instruction a 'br'?
-				if is_br(last_instr):
-
-					# if the last instruction is a br, there exists two kinds 
-					# of br:
-					#   - conditionals (=> two succ)
-					#   - unconditionals (=> one succ)
-					uncond_br: Union[Match[str], None] = is_uncond_br(last_instr)
-					if uncond_br:
-						label = extract_label(uncond_br.group())
-						bb_id = cfg.get_id_by_label(label)
-						bb.add_succ(bb_id)
-						cfg.get_basic_block(bb_id).add_pred(bb.id)
-					else: # cond_br
-						labels = search_label_in_cond_br(last_instr)
-						l1, l2 = labels
-						l1 = extract_label(l1)
-						l2 = extract_label(l2)
-						bb1_id = cfg.get_id_by_label(l1)
-						bb2_id = cfg.get_id_by_label(l2)
-						bb.add_succ(bb1_id)
-						cfg.get_basic_block(bb1_id).add_pred(bb.id)
-						bb.add_succ(bb2_id)
-						cfg.get_basic_block(bb2_id).add_pred(bb.id)
-				
-				# not a br statement: we could have a switch statement
-				else:
-					if is_switch_end(last_instr): # possible switch statement
-						i, is_switch_instr, switch_instr = bb.len() - 1, False, []
-						while i >= 0 and not is_switch_instr:
-							switch_instr.append(bb.get_instr(i))
-							is_switch_instr = is_switch(bb.get_instr(i))
-							i -=1
-						if is_switch_instr: # now, we are sure that it was a switch
-							for line in switch_instr:
-								label = has_label(line)
-								if label:
-									label = extract_label(label.group())
-									bb_id = cfg.get_id_by_label(label)
-									bb.add_succ(bb_id)
-									cfg.get_basic_block(bb_id).add_pred(bb.id)
+	# there exists two kinds of br:
+	#   - conditionals (=> two succ)
+	#   - unconditionals (=> one succ)
+	uncond_br: Union[Match[str], None] = is_uncond_br(instr)
+	if uncond_br:
+		return [extract_label(uncond_br.group())]
+	return [extract_label(label) for label in search_label_in_cond_br(instr)]
+
+def add_jumps(
+		cfg: CFG,
+		basic_block: BasicBlock,
+		labels: List[str],
+		fixups: List[Tuple[int, str]]
+	) -> None:
+	"""
+	Adds the successors of a BB ending with a jump (br, switch) to labels. 
+	Labels already defined are resolved at once, the others (forward 
+	references) are recorded in `fixups` to be resolved at the end of the 
+	function. Several cases of a switch jumping to the same label only add 
+	one edge.
+	"""
+	for label in dict.fromkeys(labels): # without duplicates
+		target_id: int | None = cfg.get_id_by_label(label)
+		if target_id != None:
+			add_jump(cfg, basic_block, target_id)
+		else:
+			fixups.append((basic_block.get_id(), label))
+	return None
 
+def add_jump(cfg: CFG, basic_block: BasicBlock, target_id: int) -> None:
+	"""
+	Adds an edge from a BB to the BB target_id (called 'indirect' successor
+	and predecessor)
+	"""
+	basic_block.add_succ(target_id)
+	cfg.get_basic_block(target_id).add_pred(basic_block.get_id())
 	return None
 
 def display_result(cfgs: List[CFG]) -> None:
@@ -0,0 +1,171 @@
+from kreachdist.summary import summarize_functions, summarize
+from kreachdist.parse import iter_cfgs
+from kreachdist.datastructs.CFG import CFG
+from kreachdist.datastructs.Program import Program
+from kreachdist.utils.regex import extract_called_function, is_call
+from kreachdist.utils.misc import get_last_instr
+
+import queue
+import threading
+from typing import Callable, List, Mapping, Set, Tuple
+
+# Parsing and summarizing in a pipeline: a thread parses the LLVM file and
+# hands the CFGs over (through a bounded queue) as soon as their function is
+# parsed, while the summaries of the functions whose callees are all known are
+# computed. Functions declared but not defined in the file (e.g. klee_reach, 
+# the libc) have no CFG: their calls cost nothing, like in `summarize`. The
+# remaining functions (recursive ones, callers of functions defined further in
+# the file) are summarized once the whole file is parsed, with the usual SCC
+# order.
+
+# the CFGs are handed over by batches (fewer thread switches); at most
+# QUEUE_SIZE batches wait to be summarized
+BATCH_SIZE = 16
+QUEUE_SIZE = 8
+# how often (in seconds) a producer waiting for room in the queue checks 
+# whether the consumer gave up (e.g. on an error)
+PUT_TIMEOUT = 0.1
+
+def is_intrinsic(function_name: str) -> bool:
+	"""
+	Checks if a function is a LLVM intrinsic (never defined in the file)
+	"""
+	# note: `extract_called_function` stops at the first '.'
+	return function_name == "@llvm" or function_name.startswith("@llvm.")
+
+def called_functions(cfg: CFG) -> Set[str]:
+	"""
+	Returns the functions called by a CFG (LLVM intrinsics and indirect calls
+	excepted)
+	"""
+	called: Set[str] = set()
+	for bb in cfg.get_basic_blocks():
+		last_instr: str = get_last_instr(bb)
+		if is_call(last_instr):
+			name: str = extract_called_function(last_instr)
+			if name != "" and not is_intrinsic(name):
+				called.add(name)
+	return called
+
+def parse_and_summarize(
+		file_name: str,
+		debug: bool,
+		prepare: Callable[[CFG], None] = None
+	) -> Tuple[Program, Mapping[str, int]]:
+	"""
+	Parses a LLVM file and computes the summaries of its functions,
+	summarizing functions while the rest of the file is parsed. `prepare` is
+	applied to each CFG before it is summarized (e.g. to set the weights of
+	its basic blocks).
+	Returns the same program and summaries as `parse` then
+	`summarize_functions`.
+	"""
+	program: Program = Program()
+	cfg_queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+	# set when the consumer stops reading the queue
+	stopped: threading.Event = threading.Event()
+
+	def hand_over(item) -> bool:
+		"""
+		Puts an item in the queue, unless the consumer stopped reading it
+		"""
+		while not stopped.is_set():
+			try:
+				cfg_queue.put(item, timeout=PUT_TIMEOUT)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+	def produce() -> None:
+		# the batches come with the functions declared since the previous one
+		batch: List[CFG] = []
+		declared_count: int = 0
+		def next_batch() -> Tuple[List[CFG], List[str]]:
+			nonlocal declared_count
+			names: List[str] = list(program.get_declared_functions())
+			new_names: List[str] = names[declared_count:]
+			declared_count = len(names)
+			return batch, new_names
+		try:
+			for cfg in iter_cfgs(file_name, program):
+				batch.append(cfg)
+				if len(batch) == BATCH_SIZE:
+					if not hand_over(next_batch()):
+						return None
+					batch = []
+		except BaseException as e: # re-raised by the consumer
+			hand_over(e)
+			return None
+		if hand_over(next_batch()):
+			hand_over(None)
+		return None
+
+	producer = threading.Thread(target=produce, daemon=True)
+	producer.start()
+
+	summaries: Mapping[str, int] = {}
+	defined_functions: Mapping[str, bool] = program.get_defined_functions()
+	declared_functions: Set[str] = set()
+	parsed: Mapping[str, CFG] = {}
+	# functions whose summary is needed, for each function waiting for them
+	waiting_for: Mapping[str, Set[str]] = {}
+	# functions waiting, for each function whose summary is needed
+	callers: Mapping[str, Set[str]] = {}
+
+	def resolve(ready: List[str]) -> None:
+		"""
+		Summarizes the functions of `ready`, whose callees are all summarized
+		or declared, then the functions that were waiting for them only
+		"""
+		nonlocal summaries
+		while ready:
+			f = ready.pop()
+			if f in parsed:
+				# the defined functions that are not parsed yet are not needed
+				summaries = summarize(parsed[f], summaries, defined_functions)
+			for caller in callers.pop(f, ()):
+				waiting_for[caller].discard(f)
+				if not waiting_for[caller]:
+					del waiting_for[caller]
+					ready.append(caller)
+		return None
+
+	try:
+		while True:
+			item = cfg_queue.get()
+			if item == None:
+				break
+			if isinstance(item, BaseException):
+				raise item
+			batch, declared = item
+
+			# the calls to the declared functions cost nothing
+			declared_functions.update(declared)
+			resolve(list(declared))
+
+			for cfg in batch:
+				if prepare != None:
+					prepare(cfg)
+				name: str = cfg.get_name()
+				parsed[name] = cfg
+
+				missing: Set[str] = {f for f in called_functions(cfg)
+									 if f not in summaries
+									 and f not in declared_functions}
+				if missing:
+					waiting_for[name] = missing
+					for f in missing:
+						callers.setdefault(f, set()).add(name)
+				else:
+					resolve([name])
+	finally:
+		# the producer stops at its next hand over if we stopped early
+		stopped.set()
+		producer.join()
+
+	if debug:
+		print(f"Summarized while parsing: {len(summaries)} functions")
+
+	summaries = summarize_functions(program, debug, summaries)
+	return program, summaries
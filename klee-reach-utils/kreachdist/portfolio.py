@@ -0,0 +1,173 @@
+from kreachdist.batch import SEARCHERS, has_reached
+
+import argparse
+import asyncio
+import os
+from typing import List, Mapping, Tuple
+
+# Portfolio of searchers: which searcher reaches the target first depends on
+# the program, so the searchers are run at the same time (each on its own
+# CPU when possible) with the same .dist file, and the first one reaching the
+# target wins: the others are then stopped.
+
+# time (in seconds) given to a stopped KLEE run to write its statistics
+# before it is killed
+GRACE_PERIOD = 5
+
+def parse_arguments() -> argparse.Namespace:
+	"""
+	Parses the command line arguments
+	"""
+	parser = argparse.ArgumentParser(
+		description="Runs several KLEE searchers on the same target at the "
+					"same time and stops when one of them reaches it",
+		usage="%(prog)s --klee PATH --dist DIST [options] -- KLEE_ARGS... "
+			  "FILE.bc [PROGRAM_ARGS...]")
+	parser.add_argument("--klee", required=True, metavar="PATH",
+						help="KLEE executable (built with the A-star module)")
+	parser.add_argument("--dist", required=True, metavar="DIST",
+						help=".dist file of the target")
+	parser.add_argument("--searchers", default=",".join(SEARCHERS),
+						metavar="S1,S2...",
+						help=f"searchers to run (default: "
+							 f"{','.join(SEARCHERS)})")
+	parser.add_argument("--output-dir", default="klee-portfolio", metavar="DIR",
+						help="the output directory of each searcher is "
+							 "DIR-SEARCHER (default: klee-portfolio)")
+	parser.add_argument("--timeout", type=float, metavar="S",
+						help="stop every searcher after S seconds")
+	parser.add_argument("klee_args", nargs=argparse.REMAINDER,
+						help="arguments of KLEE (after '--')")
+	args = parser.parse_args()
+	if args.klee_args[:1] == ["--"]:
+		args.klee_args = args.klee_args[1:]
+	if args.klee_args == []:
+		parser.error("the arguments of KLEE (at least the bitcode file) are "
+					 "required")
+	args.searchers = args.searchers.split(",")
+	for searcher in args.searchers:
+		if searcher not in SEARCHERS:
+			parser.error(f"unknown searcher '{searcher}' (expected one of "
+						 f"{', '.join(SEARCHERS)})")
+	return args
+
+async def run_searcher(
+		searcher: str,
+		command: List[str],
+		log_file_name: str,
+		cpu: int | None
+	) -> Tuple[str, int]:
+	"""
+	Runs KLEE with a searcher (pinned to a CPU if given) until it exits, or
+	stops it if the task is cancelled
+	Returns the searcher and the exit code of KLEE
+	"""
+	def pin() -> None:
+		os.sched_setaffinity(0, {cpu})
+
+	with open(log_file_name, "w") as log:
+		process = await asyncio.create_subprocess_exec(
+			*command, stdout=log, stderr=asyncio.subprocess.STDOUT,
+			preexec_fn=pin if cpu != None else None)
+		try:
+			return searcher, await process.wait()
+		except asyncio.CancelledError:
+			# SIGTERM lets KLEE write its statistics and exit
+			process.terminate()
+			try:
+				await asyncio.wait_for(process.wait(), GRACE_PERIOD)
+			except asyncio.TimeoutError:
+				process.kill()
+				await process.wait()
+			raise
+
+async def race(
+		klee: str,
+		dist: str,
+		searchers: List[str],
+		output_dir: str,
+		klee_args: List[str],
+		timeout: float | None
+	) -> Tuple[str | None, float, Mapping[str, str]]:
+	"""
+	Runs the searchers at the same time until one of them reaches the target
+	Returns the winner (None if no searcher has reached the target), its time
+	to reach the target, and the outcome of each searcher
+	"""
+	cpus: List[int] | None = (sorted(os.sched_getaffinity(0))
+							  if hasattr(os, "sched_setaffinity") else None)
+	loop = asyncio.get_running_loop()
+	start: float = loop.time()
+
+	tasks: List[asyncio.Task] = []
+	for i, searcher in enumerate(searchers):
+		searcher_dir: str = f"{output_dir}-{searcher}"
+		command: List[str] = ([klee, "--exit-on-error-type=Reach",
+							   f"--input-distance-file={dist}"]
+							  + SEARCHERS[searcher]
+							  + [f"--output-dir={searcher_dir}"] + klee_args)
+		cpu: int | None = (cpus[i % len(cpus)]
+						   if cpus != None and len(cpus) > 1 else None)
+		tasks.append(asyncio.create_task(
+			run_searcher(searcher, command, searcher_dir + ".log", cpu)))
+
+	outcomes: Mapping[str, str] = {searcher: "stopped" for searcher in searchers}
+	winner: str | None = None
+	elapsed: float = 0
+	pending = set(tasks)
+	while pending and winner == None:
+		remaining = None if timeout == None else timeout - (loop.time() - start)
+		if remaining != None and remaining <= 0:
+			break
+		done, pending = await asyncio.wait(
+			pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+		for task in done:
+			try:
+				searcher, code = task.result()
+			except OSError as e: # KLEE cannot be run
+				outcomes[searchers[tasks.index(task)]] = f"error ({e})"
+				continue
+			if has_reached(f"{output_dir}-{searcher}"):
+				outcomes[searcher] = "reached"
+				if winner == None:
+					winner, elapsed = searcher, loop.time() - start
+			elif code == 0:
+				outcomes[searcher] = "not reached"
+			else:
+				outcomes[searcher] = f"error (exit code {code})"
+
+	for task in pending:
+		task.cancel()
+	await asyncio.gather(*pending, return_exceptions=True)
+	return winner, elapsed, outcomes
+
+def portfolio() -> int:
+	"""
+	Runs the portfolio and displays the winner
+	Returns the exit code (0 if the target has been reached)
+	"""
+	args = parse_arguments()
+	for searcher in args.searchers:
+		if os.path.exists(f"{args.output_dir}-{searcher}"):
+			print(f"ERROR: {args.output_dir}-{searcher} already exists")
+			return 1
+
+	print(f"Racing {', '.join(args.searchers)}...")
+	winner, elapsed, outcomes = asyncio.run(
+		race(args.klee, args.dist, args.searchers, args.output_dir,
+			 args.klee_args, args.timeout))
+
+	for searcher, outcome in outcomes.items():
+		print(f"  {searcher}: {outcome} (see {args.output_dir}-{searcher}, "
+			  f"{args.output_dir}-{searcher}.log)")
+	if winner == None:
+		print("No searcher has reached the target")
+		return 1
+	print(f"Winner: {winner}, target reached in {elapsed:.2f}s")
+	return 0
+
+def main():
+	raise SystemExit(portfolio())
+
+if __name__ == "__main__":
+	main()
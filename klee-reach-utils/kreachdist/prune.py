@@ -0,0 +1,384 @@
+from kreachdist.compute_distance import explore_backward, add_bb_distances, add_summary, default_targets, find_targets_by_lines, target_lines, target_distance
+from kreachdist.incremental import invalidated_functions
+from kreachdist.summary import summarize_functions
+from kreachdist.parse import parse
+from kreachdist.datastructs.CFG import CFG
+from kreachdist.datastructs.DistanceContainer import DistanceContainer
+from kreachdist.datastructs.Program import Program
+from kreachdist.datastructs.ShortestPathTree import ShortestPathTree
+from kreachdist.datastructs.Supergraph import Supergraph
+from kreachdist.utils.CallPaths import build_supergraph
+from kreachdist.utils.misc import get_cfg_by_name, get_file_stamp, get_last_instr
+from kreachdist.utils.regex import is_call, is_ret, extract_called_function
+
+import heapq
+import math
+from typing import List, Mapping, Set, Tuple
+
+# Pruning the basic blocks or edges that KLEE proved infeasible (or already
+# exhausted) and updating the distances without computing them again.
+#
+# The pruned basic blocks and edges are read from a file with one entry per
+# line ('#' starts a comment):
+#   LINE         the basic block containing the instruction at LINE
+#   LINE>LINE    the edge between the basic blocks containing these lines
+#   @function    every basic block of a function
+#
+# Pruning only makes distances grow: only the basic blocks whose shortest path
+# goes through a pruned basic block or edge (i.e. their subtree in the
+# shortest-path tree), or through a call whose summary has grown, have to be
+# updated. Their new distances are computed by Dijkstra's algorithm seeded
+# with their neighbours outside of the subtree.
+
+Block = Tuple[str, int]
+Edge = Tuple[Block, Block]
+
+def read_removals(
+		file_name: str,
+		cfgs: List[CFG]
+	) -> Tuple[Set[Block], Set[Edge]]:
+	"""
+	Reads the basic blocks and edges to prune. Raises ValueError on a malformed
+	entry or on a line without instruction.
+	"""
+	entries: List[str] = []
+	with open(file_name, "r") as f:
+		for line in f:
+			line = line.split("#")[0].strip()
+			if line != "":
+				entries.append(line)
+
+	lines: List[int] = []
+	try:
+		for entry in entries:
+			if not entry.startswith("@"):
+				lines += [int(part) for part in entry.split(">")]
+	except ValueError:
+		raise ValueError(f"{file_name}: malformed entry '{entry}'")
+	found: Mapping[int, Block] = {line: target[:2] for line, target
+								  in find_targets_by_lines(cfgs, lines).items()}
+	missing: List[int] = [line for line in lines if line not in found]
+	if missing:
+		raise ValueError(f"{file_name}: no instruction at line(s) {missing}")
+
+	blocks: Set[Block] = set()
+	edges: Set[Edge] = set()
+	for entry in entries:
+		if entry.startswith("@"):
+			cfg: CFG | None = get_cfg_by_name(cfgs, entry)
+			if cfg == None:
+				raise ValueError(f"{file_name}: unknown function '{entry}'")
+			blocks |= {(entry, bb.get_id()) for bb in cfg.get_basic_blocks()}
+		elif ">" in entry:
+			source, destination = entry.split(">")
+			edges.add((found[int(source)], found[int(destination)]))
+		else:
+			blocks.add(found[int(entry)])
+	return blocks, edges
+
+def remove_succ(cfg: CFG, bb_id: int, succ_id: int) -> None:
+	"""
+	Removes the edge bb_id -> succ_id of a CFG. A basic block which loses its
+	last successor becomes a dead end (unless it returns).
+	"""
+	bb = cfg.get_basic_block(bb_id)
+	succ = cfg.get_basic_block(succ_id)
+	if succ_id in bb.get_succ():
+		bb.get_succ().remove(succ_id)
+		if bb.get_succ() == [] and not is_ret(get_last_instr(bb)):
+			bb.set_dead_end()
+	if bb_id in succ.get_pred():
+		succ.get_pred().remove(bb_id)
+	return None
+
+def apply_removals(
+		cfgs: List[CFG],
+		supergraph: Supergraph,
+		blocks: Set[Block],
+		edges: Set[Edge]
+	) -> Supergraph:
+	"""
+	Prunes basic blocks and edges from the CFGs (in place) and returns the
+	pruned supergraph
+	"""
+	for name, bb_id in blocks:
+		cfg: CFG = get_cfg_by_name(cfgs, name)
+		bb = cfg.get_basic_block(bb_id)
+		for pred_id in list(bb.get_pred()):
+			remove_succ(cfg, pred_id, bb_id)
+		for succ_id in list(bb.get_succ()):
+			remove_succ(cfg, bb_id, succ_id)
+		bb.set_dead_end()
+	for (source_name, source_id), (destination_name, destination_id) in edges:
+		if source_name == destination_name:
+			remove_succ(get_cfg_by_name(cfgs, source_name), source_id,
+						destination_id)
+
+	def prune(graph: Mapping[Block, List[Block]]) -> Mapping[Block, List[Block]]:
+		return {
+			destination: [source for source in sources
+						  if source not in blocks
+						  and (source, destination) not in edges]
+			for destination, sources in graph.items()
+			if destination not in blocks
+		}
+	return Supergraph(prune(supergraph.get_g_call_t()),
+					  prune(supergraph.get_g_ret_t()))
+
+def build_tree(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		targets: List[Block],
+		stamp: Tuple[int, int]
+	) -> ShortestPathTree:
+	"""
+	Computes the shortest-path tree towards the targets
+	"""
+	tree: ShortestPathTree = ShortestPathTree(stamp, targets)
+	for bb_dist, cfg, bb, hop in explore_backward(cfgs, summaries, supergraph,
+												  targets, False):
+		tree.add_block((cfg.get_name(), bb.get_id()), bb_dist, hop)
+	tree.set_summaries(summaries)
+	return tree
+
+def subtrees(tree: ShortestPathTree, roots: Set[Block]) -> Set[Block]:
+	"""
+	Returns the basic blocks of the tree whose shortest path goes through one
+	of the roots (the roots included)
+	"""
+	children: Mapping[Block, List[Block]] = {}
+	for block, (_, _, (edge, cfg_name, bb_id)) in tree.get_blocks().items():
+		if edge != "target":
+			children.setdefault((cfg_name, bb_id), []).append(block)
+
+	reached: Set[Block] = {root for root in roots if tree.get_block(root) != None}
+	worklist: List[Block] = list(reached)
+	while worklist:
+		for child in children.get(worklist.pop(), ()):
+			if child not in reached:
+				reached.add(child)
+				worklist.append(child)
+	return reached
+
+def update_tree(
+		cfgs: List[CFG],
+		summaries: Mapping[str, int],
+		supergraph: Supergraph,
+		tree: ShortestPathTree,
+		affected: Set[Block]
+	) -> None:
+	"""
+	Computes again the distances of the affected basic blocks (the pruned
+	graph and summaries are given), seeding Dijkstra's algorithm with their
+	neighbours outside of the affected basic blocks
+	"""
+	g_call_t: Mapping[Block, List[Block]] = supergraph.get_g_call_t()
+	g_ret_t: Mapping[Block, List[Block]] = supergraph.get_g_ret_t()
+	# forward edges between CFGs (the supergraph only keeps the transposed ones)
+	g_call: Mapping[Block, List[Block]] = {}
+	for destination, sources in g_call_t.items():
+		for source in sources:
+			g_call.setdefault(source, []).append(destination)
+	g_ret: Mapping[Block, List[Block]] = {}
+	for destination, sources in g_ret_t.items():
+		for source in sources:
+			g_ret.setdefault(source, []).append(destination)
+
+	for block in affected:
+		tree.remove_block(block)
+	targets: Mapping[Block, Set[int]] = target_lines(cfgs, tree.get_targets())
+
+	def basic_block(block: Block):
+		return get_cfg_by_name(cfgs, block[0]).get_basic_block(block[1])
+
+	# (distance, block, has_took_ret, next hop)
+	heap: List[Tuple[int, Block, bool, Tuple[str, str, int]]] = []
+	for block in affected:
+		bb = basic_block(block)
+		if bb.is_dead_end() and bb.get_succ() == [] and block not in g_call:
+			continue # pruned
+		if block in targets:
+			heap.append((target_distance(bb, targets[block]), block, False,
+						 ("target",) + block))
+		for succ_id in bb.get_succ():
+			known = tree.get_block((block[0], succ_id))
+			if known != None:
+				heap.append((known[0] + bb.weight() + add_summary(summaries, bb),
+							 block, known[1], ("succ", block[0], succ_id)))
+		for return_site in g_ret.get(block, ()):
+			known = tree.get_block(return_site)
+			if known != None:
+				heap.append((known[0] + bb.weight(), block, True,
+							 ("ret",) + return_site))
+		for entry in g_call.get(block, ()):
+			known = tree.get_block(entry)
+			if known != None and not known[1]:
+				heap.append((known[0] + bb.weight(), block, False,
+							 ("call",) + entry))
+	heapq.heapify(heap)
+
+	while heap:
+		bb_dist, block, has_took_ret, hop = heapq.heappop(heap)
+		if tree.get_block(block) != None:
+			continue
+		tree.add_block(block, bb_dist, hop)
+		bb = basic_block(block)
+
+		for pred_id in bb.get_pred():
+			pred = (block[0], pred_id)
+			if pred in affected and tree.get_block(pred) == None:
+				pred_bb = basic_block(pred)
+				heapq.heappush(heap, (bb_dist + pred_bb.weight() +
+									  add_summary(summaries, pred_bb),
+									  pred, has_took_ret, ("succ",) + block))
+		for path, graph in (("ret", g_ret_t), ("call", g_call_t)):
+			if path == "call" and has_took_ret:
+				continue
+			for source in graph.get(block, ()):
+				if source in affected and tree.get_block(source) == None:
+					heapq.heappush(heap, (bb_dist + basic_block(source).weight(),
+										  source, has_took_ret or path == "ret",
+										  (path,) + block))
+	return None
+
+def line_distances(
+		cfgs: List[CFG],
+		tree: ShortestPathTree,
+		blocks: Set[Block]
+	) -> Mapping[int, int]:
+	"""
+	Returns the distance of each instruction of the given basic blocks (the
+	basic blocks which do not reach the targets anymore are missing)
+	"""
+	dist: DistanceContainer = DistanceContainer()
+	targets: Mapping[Block, Set[int]] = target_lines(cfgs, tree.get_targets())
+	for block in blocks:
+		known = tree.get_block(block)
+		if known != None:
+			add_bb_distances(dist, get_cfg_by_name(cfgs, block[0]).get_basic_block(block[1]),
+							 known[0], targets.get(block))
+	return dict(dist.get_elements())
+
+def tree_to_dist(cfgs: List[CFG], tree: ShortestPathTree) -> DistanceContainer:
+	"""
+	Returns the distances of the tree, in increasing order (as a .dist file)
+	"""
+	dist: DistanceContainer = DistanceContainer()
+	targets: Mapping[Block, Set[int]] = target_lines(cfgs, tree.get_targets())
+	for block, (bb_dist, _, _) in sorted(tree.get_blocks().items(),
+										 key=lambda item: item[1][0]):
+		add_bb_distances(dist, get_cfg_by_name(cfgs, block[0]).get_basic_block(block[1]),
+						 bb_dist, targets.get(block))
+	return dist
+
+def prune_distances(
+		file_name: str,
+		tree_file_name: str,
+		removals_file_name: str,
+		debug: bool,
+		target_lines: List[int] = None
+	) -> Tuple[DistanceContainer, List[Tuple[int, int]]] | None:
+	"""
+	Prunes the basic blocks and edges of removals_file_name and updates the
+	distances of the LLVM file. The shortest-path tree of the previous rounds
+	is read from (and written back to) tree_file_name; without a tree for the
+	current file and targets, the distances before pruning are computed first.
+	Returns the new distances and the changes (line, distance), with an
+	infinite distance for the instructions which do not reach the targets
+	anymore; None on error.
+	"""
+	program: Program = parse(file_name)
+	cfgs: List[CFG] = program.get_cfgs()
+
+	targets: List[Tuple]
+	if target_lines == None:
+		targets = default_targets(cfgs)
+	else:
+		found = find_targets_by_lines(cfgs, target_lines)
+		for line in target_lines:
+			if line not in found:
+				print(f"ERROR: no instruction at line {line}")
+				return None
+		targets = [found[line] for line in target_lines]
+	if targets == []:
+		print("WARNING: no target found")
+		return None
+
+	try:
+		blocks, edges = read_removals(removals_file_name, cfgs)
+	except (OSError, ValueError) as e:
+		print(f"ERROR: cannot read the pruned blocks: {e}")
+		return None
+
+	stamp: Tuple[int, int] = get_file_stamp(file_name)
+	tree: ShortestPathTree | None = ShortestPathTree.load(tree_file_name)
+	if tree == None or tree.get_stamp() != stamp or tree.get_targets() != targets:
+		# first round: the distances KLEE currently uses
+		summaries: Mapping[str, int] = summarize_functions(program, debug)
+		tree = build_tree(cfgs, summaries, build_supergraph(cfgs), targets, stamp)
+
+	blocks -= tree.get_removed_blocks()
+	edges -= tree.get_removed_edges()
+	supergraph: Supergraph = apply_removals(cfgs, build_supergraph(cfgs),
+											tree.get_removed_blocks() | blocks,
+											tree.get_removed_edges() | edges)
+
+	# only the summaries of the pruned functions and of their callers can grow
+	changed: Set[str] = ({name for name, _ in blocks}
+						 | {source[0] for source, _ in edges})
+	old_summaries: Mapping[str, int] = tree.get_summaries()
+	invalidated: Set[str] = invalidated_functions(cfgs, changed)
+	summaries = summarize_functions(program, debug, {
+		name: summary for name, summary in old_summaries.items()
+		if name not in invalidated
+	})
+	grown: Set[str] = {name for name, summary in summaries.items()
+					   if summary != old_summaries.get(name)}
+
+	if debug:
+		print(f"Pruned: {len(blocks)} basic blocks, {len(edges)} edges")
+		print(f"Grown summaries: {sorted(grown)}")
+
+	# basic blocks whose shortest path goes through what has changed
+	roots: Set[Block] = set(blocks)
+	for source, destination in edges:
+		known = tree.get_block(source)
+		if known != None and known[2][1:] == destination:
+			roots.add(source)
+	for block, (_, _, hop) in tree.get_blocks().items():
+		if hop[0] == "succ":
+			last_instr: str = get_last_instr(
+				get_cfg_by_name(cfgs, block[0]).get_basic_block(block[1]))
+			if is_call(last_instr) and extract_called_function(last_instr) in grown:
+				roots.add(block)
+	affected: Set[Block] = subtrees(tree, roots)
+
+	before: Mapping[int, int] = line_distances(cfgs, tree, affected)
+	update_tree(cfgs, summaries, supergraph, tree, affected)
+	after: Mapping[int, int] = line_distances(cfgs, tree, affected)
+
+	if debug:
+		print(f"Updated: {len(affected)} basic blocks")
+
+	tree.set_summaries(summaries)
+	tree.add_removals(blocks, edges)
+	tree.save(tree_file_name)
+
+	changes: List[Tuple[int, int]] = []
+	for line, distance in sorted(before.items()):
+		if after.get(line, math.inf) != distance:
+			changes.append((line, after.get(line, math.inf)))
+
+	return tree_to_dist(cfgs, tree), changes
+
+def write_delta(changes: List[Tuple[int, int]], file_name: str) -> None:
+	"""
+	Writes the changes of the distances in a .ddist file: 'line:distance'
+	lines, 'line:inf' for the instructions which do not reach the targets
+	anymore
+	"""
+	with open(file_name + ".ddist", "w") as f:
+		for line, distance in changes:
+			f.write(f"{line}:{'inf' if distance == math.inf else distance}\n")
+	return None
@@ -0,0 +1,255 @@
+from kreachdist.compute_distance import build_dist_file, find_targets_by_lines
+from kreachdist.landmarks import compute_landmarks, approximate_dist_file
+from kreachdist.pipeline import parse_and_summarize
+from kreachdist.datastructs.AnalyzedModule import AnalyzedModule
+from kreachdist.datastructs.DistanceContainer import DistanceContainer
+from kreachdist.datastructs.ModuleCache import ModuleCache
+from kreachdist.utils.CallPaths import build_supergraph
+from kreachdist.utils.misc import get_file_stamp
+
+import asyncio
+import json
+import os
+import signal
+import socket
+from typing import Any, List, Mapping, Tuple
+
+# The distance server keeps analyzed LLVM files in memory and answers distance
+# requests over a Unix-domain socket.
+#
+# Protocol: each request and each response is a JSON object on a single line.
+# A connection can carry any number of requests.
+#   request:  {"module": "/abs/path/file.ll",
+#              "targets": [LINE, ...],     (optional, default: klee_reach())
+#              "format": "dist" | "json",  (optional, default: "dist")
+#              "radius": R,                (optional, approximate distances
+#              "landmarks": K,              beyond R using K landmarks)
+#              "max_distance": D,          (optional, see build_dist_file)
+#              "max_lines": N,             (optional, see build_dist_file)
+#              "output": "/abs/path/file.dist"} (optional)
+#   response: {"status": "ok", "distances": ...} ("cutoff" too with "json")
+#             {"status": "ok", "output": "/abs/path/file.dist", "count": N}
+#             {"status": "error", "message": "..."}
+# With "output", the distances are written by the server (in the .dist format)
+# instead of being sent back.
+
+FORMATS = ["dist", "json"]
+
+class RequestError(Exception):
+	"""
+	Raised when a request cannot be answered
+	"""
+	pass
+
+def file_stamp(file_name: str) -> Tuple[int, int]:
+	"""
+	Returns the (modification time, size) of a file
+	"""
+	try:
+		return get_file_stamp(file_name)
+	except OSError as e:
+		raise RequestError(f"cannot access {file_name}: {e.strerror}")
+
+def analyze_module(file_name: str, stamp: Tuple[int, int]) -> AnalyzedModule:
+	"""
+	Parses a LLVM file and computes everything that does not depend on the
+	target
+	"""
+	program, summaries = parse_and_summarize(file_name, False)
+	supergraph = build_supergraph(program.get_cfgs())
+	return AnalyzedModule(program, summaries, supergraph, stamp)
+
+def compute_distances(
+		module: AnalyzedModule,
+		target_lines: List[int] | None,
+		radius: int | None,
+		landmark_count: int,
+		max_distance: int | None,
+		max_lines: int | None
+	) -> DistanceContainer:
+	"""
+	Computes the distances to the targets (lines in the LLVM file) in an
+	analyzed module. With a radius, only the distances up to the radius are 
+	exact (see `approximate_dist_file`).
+	"""
+	cfgs = module.get_program().get_cfgs()
+	targets = None
+	if target_lines != None:
+		found = find_targets_by_lines(cfgs, target_lines)
+		missing = [line for line in target_lines if line not in found]
+		if missing:
+			raise RequestError(f"no instruction at line(s) {missing}")
+		targets = [found[line] for line in target_lines]
+	if radius == None:
+		return build_dist_file(cfgs, module.get_summaries(), False,
+							   module.get_supergraph(), targets, max_distance,
+							   max_lines)
+
+	landmarks = module.get_landmarks()
+	if landmarks == None or landmarks.size() != landmark_count:
+		landmarks = compute_landmarks(cfgs, module.get_summaries(),
+									  module.get_supergraph(), landmark_count,
+									  module.get_stamp())
+		module.set_landmarks(landmarks)
+	return approximate_dist_file(cfgs, module.get_summaries(),
+								 module.get_supergraph(), landmarks, radius,
+								 False, targets, max_distance, max_lines)
+
+def write_output(dist: DistanceContainer, output: str) -> None:
+	"""
+	Writes the distances in a .dist file
+	"""
+	with open(output, "w") as f:
+		f.write(dist.to_dist_format())
+	return None
+
+class DistanceServer:
+	"""
+	This class answers distance requests. Analyzed modules are kept in a LRU
+	cache; analyses and distance computations run in a thread pool so that the
+	server keeps accepting requests meanwhile.
+	"""
+	def __init__(self, socket_path: str, max_modules: int) -> None:
+		self.socket_path: str = socket_path
+		self.modules: ModuleCache = ModuleCache(max_modules)
+		# modules currently analyzed (concurrent requests wait for the same
+		# analysis)
+		self.pending: Mapping[str, asyncio.Future] = {}
+
+	async def get_module(self, file_name: str) -> AnalyzedModule:
+		"""
+		Returns the analyzed module of file_name, analyzing it if needed
+		"""
+		stamp = file_stamp(file_name)
+		module = self.modules.get(file_name, stamp)
+		if module != None:
+			return module
+
+		future = self.pending.get(file_name)
+		if future == None:
+			loop = asyncio.get_running_loop()
+			future = loop.run_in_executor(None, analyze_module, file_name, stamp)
+			self.pending[file_name] = future
+			future.add_done_callback(lambda _: self.pending.pop(file_name, None))
+		# a client leaving must not cancel an analysis shared with others
+		module = await asyncio.shield(future)
+		self.modules.put(file_name, module)
+		return module
+
+	async def answer(self, request: Mapping[str, Any]) -> Mapping[str, Any]:
+		"""
+		Answers a single request
+		"""
+		file_name = request.get("module")
+		if not isinstance(file_name, str):
+			raise RequestError("missing 'module'")
+		targets = request.get("targets")
+		if targets != None and (not isinstance(targets, list) or
+								not all(isinstance(t, int) for t in targets)):
+			raise RequestError("'targets' must be a list of line numbers")
+		output_format = request.get("format", "dist")
+		if output_format not in FORMATS:
+			raise RequestError(f"unknown format '{output_format}'")
+
+		radius = request.get("radius")
+		landmark_count = request.get("landmarks", 8)
+		if ((radius != None and not isinstance(radius, int))
+			or not isinstance(landmark_count, int)):
+			raise RequestError("'radius' and 'landmarks' must be integers")
+		if radius != None and radius < 0:
+			raise RequestError("'radius' cannot be negative")
+		if landmark_count < 1:
+			raise RequestError("at least one landmark is needed")
+		max_distance = request.get("max_distance")
+		max_lines = request.get("max_lines")
+		if ((max_distance != None and not isinstance(max_distance, int))
+			or (max_lines != None and not isinstance(max_lines, int))):
+			raise RequestError("'max_distance' and 'max_lines' must be integers")
+
+		module = await self.get_module(os.path.abspath(file_name))
+		loop = asyncio.get_running_loop()
+		dist = await loop.run_in_executor(None, compute_distances, module,
+										  targets, radius, landmark_count,
+										  max_distance, max_lines)
+
+		output = request.get("output")
+		if output != None:
+			await loop.run_in_executor(None, write_output, dist, output)
+			return {"status": "ok", "output": output,
+					"count": len(dist.get_elements())}
+		if output_format == "json":
+			return {"status": "ok", "cutoff": dist.get_cutoff(),
+					"distances": {str(l): d for l, d in dist.get_elements()}}
+		return {"status": "ok", "distances": dist.to_dist_format()}
+
+	async def handle_client(
+			self,
+			reader: asyncio.StreamReader,
+			writer: asyncio.StreamWriter
+		) -> None:
+		"""
+		Answers the requests of a client until it closes the connection
+		"""
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				try:
+					request = json.loads(line)
+					if not isinstance(request, dict):
+						raise RequestError("a request must be a JSON object")
+					response = await self.answer(request)
+				except json.JSONDecodeError as e:
+					response = {"status": "error", "message": f"bad request: {e}"}
+				except RequestError as e:
+					response = {"status": "error", "message": str(e)}
+				except Exception as e: # the server must survive any request
+					response = {"status": "error",
+								"message": f"{type(e).__name__}: {e}"}
+				writer.write(json.dumps(response).encode() + b"\n")
+				await writer.drain()
+		except (ConnectionResetError, BrokenPipeError):
+			pass
+		finally:
+			writer.close()
+
+	async def serve(self) -> None:
+		"""
+		Serves requests until SIGINT or SIGTERM
+		"""
+		if os.path.exists(self.socket_path): # left by a previous server
+			os.unlink(self.socket_path)
+		server = await asyncio.start_unix_server(self.handle_client,
+												 path=self.socket_path,
+												 limit=2**24)
+		stop = asyncio.Event()
+		loop = asyncio.get_running_loop()
+		for sig in (signal.SIGINT, signal.SIGTERM):
+			loop.add_signal_handler(sig, stop.set)
+
+		print(f"Distance server listening on {self.socket_path}", flush=True)
+		async with server:
+			await stop.wait()
+		os.unlink(self.socket_path)
+		return None
+
+def serve(socket_path: str, max_modules: int) -> None:
+	"""
+	Runs the distance server
+	"""
+	asyncio.run(DistanceServer(socket_path, max_modules).serve())
+	return None
+
+def request_distances(
+		socket_path: str,
+		request: Mapping[str, Any]
+	) -> Mapping[str, Any]:
+	"""
+	Sends a request to a running distance server and returns its response
+	"""
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+		s.connect(socket_path)
+		s.sendall(json.dumps(request).encode() + b"\n")
+		with s.makefile("rb") as f:
+			return json.loads(f.readline())
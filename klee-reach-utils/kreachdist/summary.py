@@ -12,13 +12,16 @@ from typing import Mapping, List, Tuple
 def summarize_functions(
 		program: Program,
 		debug: bool,
+		previous_summaries: Mapping[str, int] = None
 	) -> Mapping[str, int]:
 	"""
 	Computes the summary of each function. Takes into account possibles cross 
 	dependency between functions by using the topological order of SCCs.
+	Summaries in `previous_summaries` (e.g. from a previous analysis) are kept
+	as they are.
 	"""
 	
-	summaries: Mapping[str, int] = {}
+	summaries: Mapping[str, int] = dict(previous_summaries or {})
 	cfgs: List[CFG] = program.get_cfgs()
 	defined_functions: Mapping[str, bool] = program.get_defined_functions()
 
@@ -40,6 +43,11 @@ def summarize_functions(
 	# perform the computation of function summaries until we meet a fixed-point.
 
 	for scc in sccs:
+		# the summaries of the SCC are already known
+		if (previous_summaries and
+			all(cfgs[n].get_name() in previous_summaries for n in scc)):
+			continue
+
 		if len(scc) == 1: # no cross dependency between functions
 			cfg: CFG = cfgs[scc[0]] # the only CFG of the component
 			summaries = summarize(cfg, summaries, defined_functions)
@@ -85,7 +93,7 @@ def summarize(
 	n: int = cfg.get_basic_block(0).get_id()
 	last_instr: str = get_last_instr(cfg.get_basic_block(0))
 	heapq.heappush(heap, 
-				   (cfg.get_basic_block(0).size() + 
+				   (cfg.get_basic_block(0).weight() + 
 					call_cost(last_instr, summaries, defined_functions),
 					n)
 				  )
@@ -109,7 +117,7 @@ def summarize(
 				last_instr = get_last_instr(next_bb)
 				heapq.heappush(heap,
 							   (s[0] +
-		   						next_bb.size() +
+		   						next_bb.weight() +
 								call_cost(last_instr, summaries, defined_functions),
 								n)
 							   )
@@ -1,4 +1,5 @@
 from kreachdist.datastructs.CFG import CFG
+from kreachdist.datastructs.Supergraph import Supergraph
 from kreachdist.utils.regex import extract_called_function, is_call
 from kreachdist.utils.misc import get_last_instr, is_ret, get_cfg_by_name
 
@@ -70,3 +71,11 @@ def transpose_g_ret(
 			g_ret_t[e] = [key]
 
 	return g_ret_t
+
+def build_supergraph(cfgs: List[CFG]) -> Supergraph:
+	"""
+	Computes G_call & G_ret from CFGs and keeps their transpose graphs
+	"""
+	g_call = compute_g_call(cfgs)
+	g_ret = compute_g_ret(cfgs, g_call)
+	return Supergraph(transpose_g_call(g_call), transpose_g_ret(g_ret))
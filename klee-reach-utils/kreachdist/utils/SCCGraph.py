@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from kreachdist.datastructs.CFG import CFG
 from kreachdist.utils.regex import extract_called_function, is_call
-from kreachdist.utils.misc import get_last_instr, get_cfg_by_name
+from kreachdist.utils.misc import get_last_instr
 
 from collections import defaultdict
 from typing import List, Dict
@@ -88,14 +88,12 @@ def build_dependency_graph(cfgs: List[CFG]) -> SCCGraph:
 	Builds a dependency graph for calls between CFGs
 	"""
 	G: SCCGraph = SCCGraph(len(cfgs))
-	i: int = 0
+	ids: Dict[str, int] = {cfg.get_name(): cfg.get_id() for cfg in cfgs}
 	for f in cfgs:
 		for bb in f.get_basic_blocks():
 			last_instr: str = get_last_instr(bb)
 			if is_call(last_instr): # the BB ended with a call
 				called_func: str = extract_called_function(last_instr)
-				if get_cfg_by_name(cfgs, called_func) != None:
-					G.add_edge(get_cfg_by_name(cfgs, f.name).get_id(),
-							   get_cfg_by_name(cfgs, called_func).get_id())
-		i += 1
+				if called_func in ids:
+					G.add_edge(f.get_id(), ids[called_func])
 	return G
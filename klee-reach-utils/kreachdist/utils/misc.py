@@ -3,13 +3,27 @@ from kreachdist.datastructs.CFG import CFG
 from kreachdist.datastructs.LLVMInstr import LLVMInstr
 from kreachdist.utils.regex import is_ret
 
+import bz2
+import gzip
+import io
+import lzma
+import os
 import re
-from typing import List, Union
+import sys
+from typing import List, TextIO, Tuple, Union
+
+# decompressors of the compressed LLVM files, by extension
+DECOMPRESSORS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
+# size of the chunks read from LLVM files
+READ_CHUNK_SIZE = 1 << 20
 
 def is_end_of_cfg(instr: str, basic_block: BasicBlock) -> bool:
 	"""
 	Checks if instr or basic_block is an exit point of the function
 	"""
+	if basic_block.is_dead_end():
+		return False
 	return is_ret(instr) or basic_block.get_succ() == []
 
 def new_id(current_id: int) -> int:
@@ -46,6 +60,42 @@ def reset_last_bb_succ(cfg: CFG) -> None:
 	cfg.get_basic_block(-1).reset_succ()
 	return None
 
+def get_file_stamp(file_name: str) -> Tuple[int, int]:
+	"""
+	Returns the (modification time, size) of a file, used to detect that a 
+	file has been rewritten
+	"""
+	st = os.stat(file_name)
+	return st.st_mtime_ns, st.st_size
+
+def open_llvm_file(file_name: str) -> TextIO:
+	"""
+	Opens a LLVM file to read it line by line: '-' is the standard input, and
+	.gz, .xz and .bz2 files are decompressed on the fly (in chunks, without 
+	temporary file)
+	"""
+	if file_name == "-":
+		return open(sys.stdin.fileno(), "r", buffering=READ_CHUNK_SIZE,
+					closefd=False)
+	for extension, decompressor in DECOMPRESSORS.items():
+		if file_name.endswith(extension):
+			return io.TextIOWrapper(
+				io.BufferedReader(decompressor(file_name, "rb"),
+								  buffer_size=READ_CHUNK_SIZE))
+	return open(file_name, "r", buffering=READ_CHUNK_SIZE)
+
+def llvm_file_prefix(file_name: str) -> str:
+	"""
+	Returns the path of a LLVM file without its extensions (FILE.ll, 
+	FILE.ll.gz... -> FILE), used to name the files written next to it
+	"""
+	for extension in DECOMPRESSORS:
+		if file_name.endswith(extension):
+			file_name = file_name[:-len(extension)]
+	if file_name.endswith(".ll"):
+		file_name = file_name[:-3]
+	return file_name
+
 ###
 ### HANDLE SPECIALS LLVM KEYWORDS
 ###
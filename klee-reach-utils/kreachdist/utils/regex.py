@@ -11,6 +11,12 @@ def is_define(instr: str) -> bool:
 	"""
 	return re.search("define ", instr) != None
 
+def is_declare(instr: str) -> bool:
+	"""
+	Checks if instr is a declare instruction (a function defined elsewhere)
+	"""
+	return instr.startswith("declare ")
+
 def is_end_of_define(instr: str) -> bool:
 	"""
 	Checks if instr is the end of a define instruction 
@@ -51,6 +57,18 @@ def extract_called_function(instr: str) -> str:
 	called_func = re.search("@\w+", instr)
 	return (called_func.group() if called_func != None else "")
 
+#### Metadata
+
+def strip_metadata_refs(instr: str) -> str:
+	"""
+	Removes the numbers of metadata references in instr (these numbers shift
+	as soon as the debug information of another function changes)
+
+	Expected input: "ret void, !dbg !25"
+	Expected output: "ret void, !dbg !"
+	"""
+	return re.sub("!\\d+", "!", instr)
+
 #### Branches
 
 def is_br(instr: str) -> bool:
@@ -0,0 +1,54 @@
+define dso_local void @foo(i32 %x) #0 !dbg !9 {
+entry:
+  %x.addr = alloca i32, align 4
+  store i32 %x, i32* %x.addr, align 4
+  call void @llvm.dbg.declare(metadata i32* %x.addr, metadata !14, metadata !DIExpression()), !dbg !15
+  %0 = load i32, i32* %x.addr, align 4, !dbg !16
+  %cmp = icmp sgt i32 %0, 0, !dbg !18
+  br i1 %cmp, label %if.then, label %if.end, !dbg !19
+
+if.then:                                          ; preds = %entry
+  %1 = load i32, i32* %x.addr, align 4, !dbg !20
+  %dec = add nsw i32 %1, -1, !dbg !20
+  store i32 %dec, i32* %x.addr, align 4, !dbg !20
+  %2 = load i32, i32* %x.addr, align 4, !dbg !22
+  call void (i32, ...) bitcast (void (...)* @bar to void (i32, ...)*)(i32 %2), !dbg !23
+  br label %if.end, !dbg !24
+
+if.end:                                           ; preds = %if.then, %entry
+  ret void, !dbg !25
+}
+define dso_local void @bar(i32 %x) #0 !dbg !26 {
+entry:
+  %x.addr = alloca i32, align 4
+  store i32 %x, i32* %x.addr, align 4
+  call void @llvm.dbg.declare(metadata i32* %x.addr, metadata !27, metadata !DIExpression()), !dbg !28
+  %0 = load i32, i32* %x.addr, align 4, !dbg !29
+  %cmp = icmp sgt i32 %0, 0, !dbg !31
+  br i1 %cmp, label %if.then, label %if.end, !dbg !32
+
+if.then:                                          ; preds = %entry
+  %1 = load i32, i32* %x.addr, align 4, !dbg !33
+  %sub = sub nsw i32 %1, 2, !dbg !33
+  store i32 %sub, i32* %x.addr, align 4, !dbg !33
+  %2 = load i32, i32* %x.addr, align 4, !dbg !35
+  call void @foo(i32 %2), !dbg !36
+  br label %if.end, !dbg !37
+
+if.end:                                           ; preds = %if.then, %entry
+  ret void, !dbg !38
+}
+!llvm.dbg.cu = !{!0}
+!0 = distinct !DICompileUnit(language: DW_LANG_C99, file: !1, producer: "clang version 13.0.1", isOptimized: false, runtimeVersion: 0, emissionKind: FullDebug, enums: !2, splitDebugInlining: false, nameTableKind: None)
+!1 = !DIFile(filename: "cross_rec.c", directory: "/tmp")
+!2 = !{}
+!9 = distinct !DISubprogram(name: "foo", scope: !1, file: !1, line: 7, type: !10, scopeLine: 7, spFlags: DISPFlagDefinition, unit: !0, retainedNodes: !2)
+!16 = !DILocation(line: 8, column: 6, scope: !9)
+!20 = !DILocation(line: 9, column: 4, scope: !9)
+!23 = !DILocation(line: 10, column: 3, scope: !9)
+!26 = distinct !DISubprogram(name: "bar", scope: !1, file: !1, line: 14, type: !10, scopeLine: 14, spFlags: DISPFlagDefinition, unit: !0, retainedNodes: !2)
+!36 = !DILocation(line: 17, column: 3, scope: !26)
+!39 = distinct !DISubprogram(name: "main", scope: !1, file: !1, line: 21, type: !10, scopeLine: 21, spFlags: DISPFlagDefinition, unit: !0, retainedNodes: !2)
+!45 = !DILocation(line: 22, column: 2, scope: !39)
+!47 = !DILocation(line: 23, column: 2, scope: !39)
+!48 = !DILocation(line: 24, column: 2, scope: !39)
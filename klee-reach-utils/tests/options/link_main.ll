@@ -0,0 +1,55 @@
+; ModuleID = 'cross_rec.bc'
+source_filename = "cross_rec.c"
+target datalayout = "e-m:e-p270:32:32-p271:32:32-p272:64:64-i64:64-f80:128-n8:16:32:64-S128"
+target triple = "x86_64-pc-linux-gnu"
+
+; Function Attrs: noinline nounwind uwtable
+
+; Function Attrs: nofree nosync nounwind readnone speculatable willreturn
+declare void @llvm.dbg.declare(metadata, metadata, metadata) #1
+
+; Function Attrs: noinline nounwind uwtable
+
+; Function Attrs: noinline nounwind uwtable
+define dso_local i32 @main() #0 !dbg !39 {
+entry:
+  %retval = alloca i32, align 4
+  store i32 0, i32* %retval, align 4
+  %x = load i32, i32* %retval, align 4, !dbg !43
+  switch i32 %x, label %sw.default [
+    i32 0, label %sw.bb
+    i32 1, label %sw.bb1
+  ], !dbg !44
+
+sw.bb:                                            ; preds = %entry
+  call void @foo(i32 12), !dbg !45
+  br label %sw.epilog, !dbg !46
+
+sw.bb1:                                           ; preds = %entry
+  call void @bar(i32 3), !dbg !45
+  br label %sw.epilog, !dbg !46
+
+sw.default:                                       ; preds = %entry
+  br label %sw.epilog, !dbg !46
+
+sw.epilog:                                        ; preds = %sw.default, %sw.bb1, %sw.bb
+  call void (...) @klee_reach(), !dbg !47
+  ret i32 0, !dbg !48
+}
+
+declare dso_local void @klee_reach(...) #2
+
+!llvm.dbg.cu = !{!0}
+!0 = distinct !DICompileUnit(language: DW_LANG_C99, file: !1, producer: "clang version 13.0.1", isOptimized: false, runtimeVersion: 0, emissionKind: FullDebug, enums: !2, splitDebugInlining: false, nameTableKind: None)
+!1 = !DIFile(filename: "cross_rec.c", directory: "/tmp")
+!2 = !{}
+!9 = distinct !DISubprogram(name: "foo", scope: !1, file: !1, line: 7, type: !10, scopeLine: 7, spFlags: DISPFlagDefinition, unit: !0, retainedNodes: !2)
+!16 = !DILocation(line: 8, column: 6, scope: !9)
+!20 = !DILocation(line: 9, column: 4, scope: !9)
+!23 = !DILocation(line: 10, column: 3, scope: !9)
+!26 = distinct !DISubprogram(name: "bar", scope: !1, file: !1, line: 14, type: !10, scopeLine: 14, spFlags: DISPFlagDefinition, unit: !0, retainedNodes: !2)
+!36 = !DILocation(line: 17, column: 3, scope: !26)
+!39 = distinct !DISubprogram(name: "main", scope: !1, file: !1, line: 21, type: !10, scopeLine: 21, spFlags: DISPFlagDefinition, unit: !0, retainedNodes: !2)
+!45 = !DILocation(line: 22, column: 2, scope: !39)
+!47 = !DILocation(line: 23, column: 2, scope: !39)
+!48 = !DILocation(line: 24, column: 2, scope: !39)
@@ -0,0 +1,67 @@
+; ModuleID = 'reach.bc'
+source_filename = "reach.c"
+
+define dso_local i32 @main() #0 {
+  %1 = alloca i32, align 4
+  %2 = alloca i32, align 4
+  %3 = alloca i32, align 4
+  %4 = alloca i32, align 4
+  store i32 0, i32* %1, align 4
+  store i32 0, i32* %2, align 4
+  %5 = load i32, i32* %1, align 4
+  %6 = icmp sgt i32 %5, 0
+  br i1 %6, label %7, label %10
+
+7:                                                ; preds = %0
+  %8 = load i32, i32* %2, align 4
+  %9 = call i32 @foo(i32 %8)
+  br label %10
+
+10:                                               ; preds = %7, %0
+  %11 = load i32, i32* %1, align 4
+  switch i32 %11, label %14 [
+    i32 1, label %12
+    i32 2, label %13
+  ]
+
+12:                                               ; preds = %10
+  call void @klee_reach()
+  br label %15
+
+13:                                               ; preds = %10
+  store i32 1, i32* %3, align 4
+  store i32 2, i32* %3, align 4
+  store i32 3, i32* %3, align 4
+  store i32 4, i32* %3, align 4
+  store i32 5, i32* %3, align 4
+  br label %15
+
+14:                                               ; preds = %10
+  br label %15
+
+15:                                               ; preds = %14, %13, %12
+  ret i32 0
+}
+
+define dso_local i32 @foo(i32 %0) #0 {
+  %2 = alloca i32, align 4
+  store i32 %0, i32* %2, align 4
+  %3 = load i32, i32* %2, align 4
+  %4 = icmp eq i32 %3, 3
+  br i1 %4, label %5, label %6
+
+5:                                                ; preds = %1
+  call void @klee_reach()
+  br label %6
+
+6:                                                ; preds = %5, %1
+  ret i32 %3
+}
+
+define dso_local i32 @bar() #0 {
+  %1 = call i32 @foo(i32 3)
+  %2 = call i32 @main()
+  ret i32 %1
+}
+
+declare dso_local void @klee_reach()
@@ -24,3 +24,47 @@ do
 done
 
 rm -f build/*.dist.tmp a.out diff.out
+
+# Options: each options/NAME.args holds the arguments of one or more runs on
+# the LLVM files of options/ (one run per line, the output is NAME.dist).
+# Every options/expected/NAME.EXT.expected is compared with the NAME.EXT
+# written by the last run (.dist, .next, .ddist).
+mkdir -p build/options
+cd options
+python3 ../../kreachdist/main.py --serve ../build/options/kreachdist.sock > /dev/null &
+server=$!
+while [ ! -S ../build/options/kreachdist.sock ]
+do
+	sleep 0.1
+done
+
+for file in $(ls *.args)
+do
+	name=$(echo $file | sed 's/\.args$//')
+	rm -f ../build/options/$name.*
+	grep -v '^#' $file | while read -r args
+	do
+		eval "python3 ../../kreachdist/main.py $args --output ../build/options/$name.dist" > /dev/null
+	done
+
+	status="OK"
+	if ! ls expected/$name.*.expected > /dev/null 2>&1
+	then
+		status="ERROR (no expected output)"
+	fi
+	for expected in $(ls expected/$name.*.expected 2> /dev/null)
+	do
+		output=$(basename $expected .expected)
+		sort -k2 -t: ../build/options/$output > ../build/options/$output.sorted 2> /dev/null
+		if ! diff -q ../build/options/$output.sorted $expected > /dev/null
+		then
+			status="ERROR ($output)"
+		fi
+	done
+	echo "options/$name: $status"
+done
+
+kill $server
+wait $server 2> /dev/null
+rm -f *.klm *.kparse
+cd ..
@@ -73,9 +73,23 @@ std::unordered_map<int, int> klee::parseDistFile() {
     int dist_value;
 
     if (file.is_open()) {
+      int modules = 0;
       while (file) {
         std::getline(file, line);
-        if (line != "") {
+        if (line != "" && line[0] == '#') {
+          // header line (e.g. "#cutoff:D" when the map has been truncated)
+          if (line.rfind("#cutoff:", 0) == 0) {
+            (*stream) << "[AStar] Distance map truncated beyond distance "
+                      << line.substr(8)
+                      << " (missing distances are considered infinite)\n";
+          } else if (line.rfind("#module:", 0) == 0 && ++modules > 1) {
+            // map of linked modules: the lines of the other modules are
+            // numbered in their own LLVM file, only the first module is read
+            (*stream) << "[AStar] Distances of the linked module "
+                      << line.substr(8) << " ignored\n";
+            break;
+          }
+        } else if (line != "") {
           splitLine(line, line_number, dist_value);
           distances[line_number] = dist_value;
         }
@@ -3902,6 +3902,7 @@ void Executor::terminateStateOnReach(ExecutionState &state,
                                    StateTerminationType terminationType,
                                    const llvm::Twine &info,
                                    const char *suffix) {
+  ++stats::terminationReach;
   std::string message = messaget.str();
   static std::set< std::pair<Instruction*, std::string> > emittedErrors;
   Instruction * lastInst;
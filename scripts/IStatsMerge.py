@@ -1,184 +1,205 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 
 # ===-- IStatsMerge.py ----------------------------------------------------===##
-# 
+#
 #                      The KLEE Symbolic Virtual Machine
-# 
+#
 #  This file is distributed under the University of Illinois Open Source
 #  License. See LICENSE.TXT for details.
-# 
+#
 # ===----------------------------------------------------------------------===##
 
-from __future__ import division
+import sys, os, hashlib, shutil
+from itertools import zip_longest
 
-import sys, os
+# size of the reads of assembly.ll, and of the buffers of the run.istats files
+CHUNK_SIZE = 1 << 20
+# number of merged lines written at once
+WRITE_LINES = 4096
 
 class MergeError(Exception):
     pass
 
 def checkAssemblies(directories):
-    def read(d):
+    def digest(d):
+        h = hashlib.sha256()
         try:
-            return open(os.path.join(d,'assembly.ll')).read()
-        except:
-            raise MergeError("unable to open assembly for: %s"%(`d`,))
-    
-    reference = read(directories[0])
+            with open(os.path.join(d,'assembly.ll'),'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+        except OSError:
+            raise MergeError("unable to open assembly for: %r"%(d,))
+        return h.digest()
+
+    reference = digest(directories[0])
     for d in directories[1:]:
-        if reference != read(d):
+        if reference != digest(d):
             return False
     return True
 
 def allEqual(l):
     return not [i for i in l if i!=l[0]]
 
-def merge(inputs, output, outputDir):
-    inputs = [[None,iter(i)] for i in inputs]
-
-    def getLine(elt):
-        la,i = elt
-        if la is None:
-            try:
-                ln = i.next()
-            except StopIteration:
-                ln = None
-            except:
-                raise MergeError("unexpected IO error")
-            return ln
+def readHeader(input):
+    """Returns the lines of the header of a run.istats file (up to ob=)"""
+    header = []
+    for ln in input:
+        header.append(ln)
+        if ln.startswith('ob='):
+            return header
+    raise MergeError("missing ob directive")
+
+def readStatistics(input):
+    """Yields the lines of a run.istats file after its header: fl= and fn=
+    lines as (line, None), and statistic lines as (line, calls), where calls
+    are the (cfl, cfn, calls, statistic) lines following the statistic"""
+    stat, calls = None, []
+    for ln in input:
+        if ln.startswith('cfl=') or ln.startswith('cfn='):
+            if stat is None:
+                raise MergeError("unexpected call description without statistic")
+            cfl = None
+            if ln.startswith('cfl='):
+                cfl, ln = ln, next(input, '')
+                if not ln.startswith('cfn='):
+                    raise MergeError("unexpected cfl directive without function")
+            target = next(input, '')
+            if not target.startswith('calls='):
+                raise MergeError("unexpected cfn directive with calls")
+            calls.append((cfl, ln, target, next(input, '')))
+            continue
+        if stat is not None:
+            yield stat, calls
+            stat, calls = None, []
+        if ln[:1].isdigit():
+            stat = ln
         else:
-            elt[0] = None
-            return la
-    def getLines():
-        return map(getLine,inputs)
-    def putback(ln,elt):
-        assert elt[0] is None
-        elt[0] = ln
-        
+            yield ln, None
+    if stat is not None:
+        yield stat, calls
+
+def merge(inputs, output, outputDir):
     events = None
-    
+
     # read header (up to ob=)
-    while 1:
-        lns = getLines()
+    headers = [readHeader(i) for i in inputs]
+    for lns in zip_longest(*headers):
         ln = lns[0]
+        if ln is None or None in lns:
+            raise MergeError("headers differ")
         if ln.startswith('ob='):
             if [l for l in lns if not l.startswith('ob=')]:
                 raise MergeError("headers differ")
             output.write('ob=%s\n'%(os.path.join(outputDir,'assembly.ll'),))
             break
-        else:
-            if ln.startswith('positions:'):
-                if ln!='positions: instr line\n':
-                    raise MergeError("unexpected 'positions' directive")
-            elif ln.startswith('events:'):
-                events = ln[len('events: '):].strip().split(' ')
-            if not allEqual(lns):
-                raise MergeError("headers differ")
-            output.write(ln)
+        if ln.startswith('positions:'):
+            if ln!='positions: instr line\n':
+                raise MergeError("unexpected 'positions' directive")
+        elif ln.startswith('events:'):
+            events = ln[len('events: '):].split()
+        if ln.startswith('pid:'):
+            pass # one per run
+        elif not allEqual(lns):
+            raise MergeError("headers differ")
+        output.write(ln)
 
     if events is None:
         raise MergeError('missing events directive')
-    boolTypes = set(['Icov','Iuncov'])
-    numEvents = len(events)
-    eventTypes = [e in boolTypes for e in events]
-
-    def mergeStats(datas):
-        if not allEqual([d[:2] for d in datas]):
-            raise MergeError("instruction or line specifications differ")
-        elif [d for d in datas if len(d)!=numEvents+2]:
+    width = len(events)+2
+    # covered if covered by any run, uncovered if uncovered by all runs
+    reductions = [(i+2, max if e=='Icov' else min if e=='Iuncov' else sum)
+                  for i,e in enumerate(events)]
+
+    def mergeStats(lns):
+        # the lines are parsed at once: the values of column j are then
+        # values[j::width]
+        values = list(map(int, ' '.join(lns).split()))
+        if len(values)!=width*len(lns):
             raise MergeError("statistics differ in event counts")
-        
-        result = [datas[0][0],datas[0][1]]
-        for i,ev in enumerate(events):
-            s = sum([d[i+2] for d in datas])
-            if ev=='Icov':
-                result.append(max([d[i+2] for d in datas])) # true iff any are non-zero
-            elif ev=='Iuncov':
-                result.append(min([d[i+2] for d in datas])) # true iff any are non-zero
-            else:
-                result.append(s)
-        return result
-
-    def readCalls():
+        if len(set(values[0::width]))!=1 or len(set(values[1::width]))!=1:
+            raise MergeError("instruction or line specifications differ")
+        result = values[:2] + [reduce(values[j::width]) for j,reduce in reductions]
+        return ' '.join(map(str,result)) + '\n'
+
+    def mergeCalls(callss):
+        # calls to the same function from the same instruction, in the order
+        # of their first description
         results = {}
-        for elt in inputs:
-            while 1:
-                ln = getLine(elt)
-                if ln is not None and (ln.startswith('cfl=') or ln.startswith('cfn=')):
-                    if ln.startswith('cfl='):
-                        cfl = ln
-                        cfn = getLine(elt)
-                        if not cfn.startswith('cfn='):
-                            raise MergeError("unexpected cfl directive without function")
-                    else:
-                        cfl = None
-                        cfn = ln
-                    target = getLine(elt)
-                    if not target.startswith('calls='):
-                        raise MergeError("unexpected cfn directive with calls")
-                    stat = map(int,getLine(elt).strip().split(' '))
-                    key = target
-                    existing = results.get(target)
-                    if existing is None:
-                        results[key] = [cfl,cfn,target,stat]
-                    else:
-                        if existing[0]!=cfl or existing[1]!=cfn:
-                            raise MergeError("multiple call descriptions for a single target")
-                        existing[3] = mergeStats([existing[3],stat])
+        for calls in callss:
+            for cfl,cfn,target,stat in calls:
+                count,_,position = target[len('calls='):].partition(' ')
+                key = (cfl,cfn,position)
+                existing = results.get(key)
+                if existing is None:
+                    results[key] = [int(count),[stat]]
                 else:
-                    putback(ln, elt)
-                    break
-        return results
-    
-    # read statistics
-    while 1:
-        lns = getLines()
-        ln = lns[0]
-        if ln is None:
-            if not allEqual(lns):
-                raise MergeError("unexpected end of input")
-            break
-        elif ln.startswith('fn') or ln.startswith('fl'):
+                    existing[0] += int(count)
+                    existing[1].append(stat)
+        lines = []
+        for (cfl,cfn,position),(count,stats) in results.items():
+            if cfl is not None:
+                lines.append(cfl)
+            lines.append(cfn)
+            lines.append('calls=%d %s'%(count,position))
+            lines.append(mergeStats(stats))
+        return lines
+
+    # read statistics, one line of each input at a time
+    pending = []
+    for records in zip_longest(*[readStatistics(i) for i in inputs]):
+        if None in records:
+            raise MergeError("unexpected end of input")
+        lns = [ln for ln,_ in records]
+        if records[0][1] is None:
             if not allEqual(lns):
                 raise MergeError("files differ")
-            output.write(ln)
+            pending.append(lns[0])
         else:
-            # an actual statistic
-            data = [map(int,ln.strip().split(' ')) for ln in lns]
-            print >>output,' '.join(map(str,mergeStats(data)))
-
-            # read any associated calls
-            for cfl,cfn,calls,stat in readCalls().values():
-                if cfl is not None:
-                    output.write(cfl)
-                output.write(cfn)
-                output.write(calls)
-                print >>output,' '.join(map(str,stat))
-            
+            # an actual statistic and any associated calls
+            pending.append(mergeStats(lns))
+            callss = [calls for _,calls in records if calls]
+            if callss:
+                pending += mergeCalls(callss)
+        if len(pending) >= WRITE_LINES:
+            output.write(''.join(pending))
+            pending = []
+    output.write(''.join(pending))
+
 def main(args):
-    from optparse import OptionParser
-    op = OptionParser("usage: %prog [options] directories+ output")
-    opts,args = op.parse_args()
+    from argparse import ArgumentParser
+    op = ArgumentParser(usage="%(prog)s [options] directories+ output")
+    op.add_argument('directories', nargs='+',
+                    help='KLEE output directories, then the output directory')
+    opts = op.parse_args(args[1:])
 
-    output = args.pop()
-    directories = args
+    directories = opts.directories
+    output = directories.pop()
 
     if len(directories)<=1:
         op.error("incorrect number of arguments")
 
-    print 'Merging:',', '.join(directories)
-    print 'Into:',output
+    print('Merging:',', '.join(directories))
+    print('Into:',output)
 
     if not checkAssemblies(directories):
         raise MergeError("executables differ")
 
     if not os.path.exists(output):
         os.mkdir(output)
-        
-    assembly = open(os.path.join(directories[0],'assembly.ll')).read()
-    open(os.path.join(output,'assembly.ll'),'w').write(assembly)
 
-    inputs = [open(os.path.join(d,'run.istats')) for d in directories]
-    merge(inputs, open(os.path.join(output,'run.istats'),'w'), output)
+    shutil.copyfile(os.path.join(directories[0],'assembly.ll'),
+                    os.path.join(output,'assembly.ll'))
+
+    inputs = [open(os.path.join(d,'run.istats'),buffering=CHUNK_SIZE) for d in directories]
+    try:
+        with open(os.path.join(output,'run.istats'),'w',buffering=CHUNK_SIZE) as f:
+            merge(inputs, f, output)
+    finally:
+        for i in inputs:
+            i.close()
 
 if __name__=='__main__':
     main(sys.argv)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# Drives the modes of klee-stats that keep running (--follow, --grafana,
+# --stream):
+# klee-stats is started on a run (a copy: it is modified), records are written
+# to its run.stats while it runs or it is queried, and what it outputs is
+# printed for FileCheck.
+
+import argparse
+import json
+import os
+import shlex
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# seconds to wait for an output of klee-stats
+TIMEOUT = 30
+
+
+def reopen(run):
+    """Make a finished run look running again (klee-stats never reads a
+    finished run twice)."""
+    info = os.path.join(run, "info")
+    with open(info) as f:
+        lines = f.readlines()
+    with open(info, "w") as f:
+        for line in lines:
+            if line.startswith("Finished:"):
+                break
+            f.write(line)
+
+
+def appendRecord(database, **values):
+    """Append a copy of the last record of the database, with the given
+    values."""
+    conn = sqlite3.connect(database)
+    cursor = conn.execute("SELECT * FROM stats ORDER BY rowid DESC LIMIT 1")
+    record = dict(zip([d[0] for d in cursor.description], cursor.fetchone()))
+    record.update(values)
+    conn.execute("INSERT INTO stats ({0}) VALUES ({1})".format(
+        ", ".join(record), ", ".join("?" * len(record))), list(record.values()))
+    conn.commit()
+    conn.close()
+
+
+def updateRecord(database, rowid, **values):
+    """Overwrite values of an existing record of the database."""
+    conn = sqlite3.connect(database)
+    conn.execute("UPDATE stats SET {0} WHERE rowid = ?".format(
+        ", ".join("{0} = ?".format(c) for c in values)), list(values.values()) + [rowid])
+    conn.commit()
+    conn.close()
+
+
+class Output:
+    """Collect the lines written by a process, in a thread."""
+    def __init__(self, stream):
+        self.lines = []
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.read, args=(stream,), daemon=True)
+        self.thread.start()
+
+    def read(self, stream):
+        for line in stream:
+            with self.condition:
+                self.lines.append(line)
+                self.condition.notify_all()
+
+    def waitFor(self, prefix, count):
+        """Wait until `count` lines start with `prefix`."""
+        with self.condition:
+            if not self.condition.wait_for(
+                    lambda: sum(l.startswith(prefix) for l in self.lines) >= count, TIMEOUT):
+                sys.exit("Timeout: {0} line(s) starting with {1!r} expected".format(count, prefix))
+
+
+def follow(args, run):
+    """Append a record after the first table. An older record is changed at
+    the same time: --follow only reads the new records, so the change must not
+    show up."""
+    database = os.path.join(run, "run.stats")
+    process = subprocess.Popen(
+        shlex.split(args.klee_stats) + ["--table-format=csv",
+        "--print-columns", "Instrs,MaxActiveStates,AvgActiveStates",
+        run, "--follow=0.1"], stdout=subprocess.PIPE, universal_newlines=True)
+    output = Output(process.stdout)
+    try:
+        output.waitFor("Every", 2)
+        updateRecord(database, 1, NumStates=100)
+        appendRecord(database, Instructions=7, NumStates=4)
+        output.waitFor("7,", 1)
+    finally:
+        # lit runs its commands with SIGINT ignored
+        process.terminate()
+        process.wait(TIMEOUT)
+    output.thread.join(TIMEOUT)
+    sys.stdout.writelines(output.lines)
+
+
+def freePort():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def waitForServer(url, process):
+    """Wait until the web server of klee-stats answers."""
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("klee-stats exited with status {0}".format(process.returncode))
+        try:
+            urllib.request.urlopen(url, timeout=TIMEOUT).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    sys.exit("Timeout: no answer from {0}".format(url))
+
+
+def grafana(args, run):
+    """Query the same targets with several maxDataPoints, over 100 seconds from
+    the start of the run (the range starts before it), and print the values of
+    the datapoints of each target (their time depends on the time zone)."""
+    port = freePort()
+    process = subprocess.Popen(
+        shlex.split(args.klee_stats) + ["--grafana", "--grafana-port", str(port), run],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = "http://127.0.0.1:{0}".format(port)
+    try:
+        waitForServer(url + "/", process)
+        for points in args.max_data_points:
+            query = {"maxDataPoints": points,
+                     "range": {"from": "2000-01-01T00:00:00.000Z",
+                               "to": "2000-01-01T00:00:00.000Z"},
+                     "targets": [{"target": t} for t in args.targets]}
+            request = urllib.request.Request(
+                url + "/query", data=json.dumps(query).encode(),
+                headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+                result = json.load(response)
+            for datastream in result:
+                print("maxDataPoints={0} {1}: {2}".format(points, datastream["target"],
+                      [value for value, _ in datastream["datapoints"]]))
+    finally:
+        process.terminate()
+        process.wait(TIMEOUT)
+
+
+def stream(args, run):
+    """Subscribe to the stream of the run, append a record once the last one
+    is received, and print the records of the events received."""
+    port = freePort()
+    process = subprocess.Popen(
+        shlex.split(args.klee_stats) + ["--stream", "--stream-port", str(port),
+        "--stream-interval", "0.1", run],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = "http://127.0.0.1:{0}".format(port)
+    try:
+        waitForServer(url + "/", process)
+        with urllib.request.urlopen(url + "/stream?columns=Instructions,NumStates",
+                                    timeout=TIMEOUT) as response:
+            events = 0
+            for line in response:
+                line = line.decode().rstrip("\n")
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                print("rowid {0}: {1}".format(event["rowid"],
+                      json.dumps(event["record"], sort_keys=True)))
+                events += 1
+                if events == 1:
+                    appendRecord(os.path.join(run, "run.stats"), Instructions=7, NumStates=4)
+                else:
+                    break
+    finally:
+        process.terminate()
+        process.wait(TIMEOUT)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--klee-stats", dest="klee_stats", required=True,
+                        help="klee-stats command line")
+    parser.add_argument("--max-data-points", dest="max_data_points", type=int,
+                        action="append", default=[],
+                        help="maxDataPoints of a grafana query (can be repeated)")
+    parser.add_argument("--target", dest="targets", action="append", default=[],
+                        help="target of the grafana queries (can be repeated)")
+    parser.add_argument("mode", choices=["follow", "grafana", "stream"])
+    parser.add_argument("run", help="run directory (its run.stats is modified)")
+    args = parser.parse_args()
+    reopen(args.run)
+    {"follow": follow, "grafana": grafana, "stream": stream}[args.mode](args, args.run)
+
+
+if __name__ == "__main__":
+    main()